@@ -17,6 +17,9 @@ from core.file_transfer import ensure_remote_io_dirs
 # 创建 Console 实例用于输出提示信息。
 console = Console()
 
+# 预编译敏感变量名匹配规则，打印注入摘要时用于隐藏对应的值。
+_SENSITIVE_KEY_RE = re.compile(r"token|secret|key", re.IGNORECASE)
+
 
 # 定义辅助函数，用于根据配置生成完整的 ASR 启动命令。
 # 定义辅助函数，用于将 flag_aliases 的值统一转换为字符串列表。
@@ -178,12 +181,10 @@ def run_asr_job(
         console.print("[yellow][asr_runner] 未提供 Hugging Face token，可能无法下载模型。[/yellow]")
     # 输出环境变量注入摘要，敏感值替换为 ***。
     if env_vars:
-        redacted = []
-        for key, value in env_vars.items():
-            if any(marker in key.lower() for marker in ["token", "secret", "key"]):
-                redacted.append(f"{key}=***")
-            else:
-                redacted.append(f"{key}={value}")
+        redacted = [
+            f"{key}=***" if _SENSITIVE_KEY_RE.search(key) else f"{key}={value}"
+            for key, value in env_vars.items()
+        ]
         console.print(f"[blue][asr_runner] 将注入环境变量：{', '.join(redacted)}[/blue]")
     else:
         console.print("[blue][asr_runner] 未注入额外环境变量，沿用远端持久凭据。[/blue]")
@@ -2,6 +2,8 @@
 该模块负责检测并引导安装本地 rsync，确保文件同步能力可用。
 """
 
+# 导入 functools 模块用于缓存 rsync 的检测结果。
+import functools
 # 导入 os 模块用于在运行时调整 PATH 环境变量。
 import os
 # 导入 platform 模块用于判断当前操作系统类型。
@@ -56,6 +58,8 @@ def _register_rsync_path(rsync_path: Path) -> None:
 
     os.environ["RSYNC_PATH"] = str(rsync_path)
     _prepend_to_path(rsync_path.parent)
+    # rsync 位置可能刚刚发生变化（例如自动安装后），丢弃旧的检测缓存。
+    detect_local_rsync.cache_clear()
 
 
 def _common_windows_rsync_locations() -> Iterable[Path]:
@@ -127,8 +131,13 @@ def _resolve_rsync_path() -> Optional[Path]:
     return None
 
 
+@functools.lru_cache(maxsize=1)
 def detect_local_rsync() -> Optional[Path]:
-    """返回可用的 rsync 路径，未找到时返回 ``None``。"""
+    """返回可用的 rsync 路径，未找到时返回 ``None``。
+
+    结果在进程内缓存，避免每次镜像日志时都重新遍历 PATH；
+    通过 ``_register_rsync_path`` 登记新路径时缓存会自动失效。
+    """
 
     return _resolve_rsync_path()
 
@@ -420,7 +429,7 @@ def ensure_local_rsync(interactive: bool = True) -> bool:
             version_output = subprocess.check_output(
                 [str(rsync_path), "--version"], text=True
             )
-            version_line = version_output.splitlines()[0]
+            version_line = version_output.partition("\n")[0]
             print(f"[OK] 本地 rsync 已安装: {version_line}")
         except Exception:
             # 读取版本失败时提示用户但仍认为命令存在。
@@ -1,9 +1,17 @@
 # core/file_transfer.py
 # 该模块负责处理文件上传、结果下载以及 Round 4 要求的远端仓库部署逻辑。
+# 导入 concurrent.futures 模块以并行运行多路 rsync 下载。
+import concurrent.futures
+# 导入 functools 模块以缓存私钥路径的解析结果。
+import functools
+# 导入 heapq 模块以按文件大小均衡分配并行下载的分片。
+import heapq
 # 导入 json 模块用于在调试时格式化输出内容。
 import json
 # 导入 os 模块以便在本地进行文件遍历和平台判断。
 import os
+# 导入 re 模块以预编译本地过滤使用的通配模式。
+import re
 # 导入 shlex 模块以确保在构建 shell 命令时进行安全转义。
 import shlex
 import sys
@@ -11,16 +19,18 @@ import sys
 import subprocess
 # 导入 shutil 模块以检测 rsync 是否可用。
 import shutil
+# 导入 tempfile 模块以存放并行下载的分片文件列表。
+import tempfile
 # 导入 time 模块用于在重试时执行退避等待。
 import time
 # 导入 datetime 模块用于生成结果目录中的时间戳。
 from datetime import datetime
-# 导入 fnmatch 模块在 Windows 降级模式下执行本地过滤。
-from fnmatch import fnmatch
+# 导入 fnmatch.translate 将通配模式转换为正则，在 Windows 降级模式下执行本地过滤。
+from fnmatch import translate
 # 导入 pathlib.Path 以处理本地路径的展开与校验。
 from pathlib import Path
 # 导入 typing 模块中的 Dict、List、Optional 以完善类型注解。
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
 # 导入 rich.console.Console 以便在终端呈现彩色输出。
@@ -28,8 +38,10 @@ from rich.console import Console
 # 导入 rich.table.Table 以便在总结阶段生成信息表格。
 from rich.table import Table
 
-# 从 core.remote_exec 模块导入 run_ssh_command 函数以执行远端命令。
-from core.remote_exec import run_ssh_command
+# 导入 ssh_pool 模块，在多路并发传输前预先建立复用主连接。
+from core import ssh_pool
+# 从 core.remote_exec 模块导入 run_ssh_command 函数以执行远端命令，以及连接复用选项的构造函数。
+from core.remote_exec import _mux_options, _report_tmux_stop, _tmux_stop_command, run_ssh_command
 
 # 创建全局 Console 实例，便于在本模块中统一输出日志。
 console = Console()
@@ -41,6 +53,12 @@ console = Console()
 # 检测到这类问题，后续的下载流程将直接跳过 rsync，改用 scp 兜底。
 _RSYNC_UNUSABLE = False
 
+# 下载时 rsync 的 I/O 超时（秒），超过该时长没有数据往来即视为连接卡死。
+_RSYNC_IO_TIMEOUT_SEC = 60
+
+# 批量清理脚本中各步骤状态行的前缀，格式为 "前缀步骤名:退出码"。
+_CLEANUP_STATUS_PREFIX = "CLEANUP_STATUS:"
+
 
 # 定义一个辅助函数，用于在本地更新 ASR 仓库以保持最新状态。
 def update_local_repo(local_dir: str, branch: str) -> Dict[str, object]:
@@ -202,6 +220,12 @@ def _quote(value: str) -> str:
     return shlex.quote(value)
 
 
+# 定义辅助函数解析私钥的绝对路径，同一会话内同一私钥只展开并解析一次。
+@functools.lru_cache(maxsize=8)
+def _resolve_keyfile(keyfile: str) -> Path:
+    return Path(keyfile).expanduser().resolve()
+
+
 # 定义一个辅助函数，在 Windows 平台上将本地路径转换为 rsync 可识别的 /cygdrive 形式。
 def _format_local_path_for_rsync(local_dir: Path) -> str:
     """返回适用于 rsync 的本地路径表示，兼容 Windows/msys 环境。"""
@@ -434,9 +458,11 @@ def upload_local_to_remote(
     if keyfile:
         # 在 Windows 平台上需要将路径转换为 /cygdrive/x 形式，避免 ssh 无法识别。
         formatted_keyfile = _format_local_path_for_rsync(
-            Path(keyfile).expanduser().resolve()
+            _resolve_keyfile(keyfile)
         )
         ssh_parts.extend(["-i", formatted_keyfile])
+    # 复用大流量通道的主连接，rsync 不再单独完成握手与认证。
+    ssh_parts.extend(_mux_options(host, user, keyfile, bulk=True))
 
     # 将 SSH 命令拼接成字符串，根据平台采用合适的转义方式。
     if os.name == "nt":
@@ -490,8 +516,10 @@ def upload_local_to_remote(
     ]
     # 若配置了密钥文件则同样传递给 scp。
     if keyfile:
-        scp_key_path = Path(keyfile).expanduser().resolve()
+        scp_key_path = _resolve_keyfile(keyfile)
         scp_args.extend(["-i", _format_local_path_for_scp(scp_key_path)])
+    # scp 同样复用大流量通道的主连接。
+    scp_args.extend(_mux_options(host, user, keyfile, bulk=True))
     # 获取待上传目录中的所有项目，确保多文件复制到同一目标。
     items = sorted(local_dir.iterdir())
     # 当目录为空时提示用户并提前返回。
@@ -559,17 +587,24 @@ def _run_rsync_download(
     remote_target: str,
     local_dir: Path,
     pattern: Optional[str],
+    files_from: Optional[Path] = None,
 ) -> None:
-    # 初始化 rsync 参数列表，启用压缩、断点续传与进度展示。
+    # 初始化 rsync 参数列表，启用压缩与断点续传；单路下载时额外展示进度。
     rsync_args = [
         rsync_path,
         "-avz",
         "--partial",
         "--inplace",
-        "--progress",
+        # 连接卡死时按 I/O 超时退出，交由外层重试；已写入的部分文件会作为增量传输的基准，重试只补齐缺失的数据块。
+        f"--timeout={_RSYNC_IO_TIMEOUT_SEC}",
         "-e",
         ssh_command,
     ]
+    if files_from is None:
+        rsync_args.insert(5, "--progress")
+    else:
+        # 并行分片下载时只传输列表中的文件，多路进度交错输出没有意义，因此不再展示。
+        rsync_args.append(f"--files-from={_format_local_path_for_rsync(files_from)}")
     # 当提供了过滤模式时，使用 include/exclude 组合实现匹配。
     if pattern:
         rsync_args.extend(["--include", "*/", "--include", pattern, "--exclude", "*"])
@@ -584,6 +619,7 @@ def _run_rsync_download(
     proc = subprocess.run(
         rsync_args,
         check=False,
+        stdout=subprocess.DEVNULL if files_from is not None else None,
         stderr=subprocess.PIPE,
         text=True,
     )
@@ -595,6 +631,101 @@ def _run_rsync_download(
         )
 
 
+# 定义一个辅助函数，按文件大小将清单条目均衡地分配到若干分片中。
+def _partition_manifest(entries: List[Tuple[int, str]], parts: int) -> List[List[str]]:
+    # 由大到小依次放入当前总量最小的分片，使各路 rsync 的传输量尽量接近。
+    buckets: List[Tuple[int, int]] = [(0, index) for index in range(parts)]
+    groups: List[List[str]] = [[] for _ in range(parts)]
+    for size, relative_path in sorted(entries, reverse=True):
+        total, index = heapq.heappop(buckets)
+        groups[index].append(relative_path)
+        heapq.heappush(buckets, (total + size, index))
+    # 丢弃没有分到文件的分片。
+    return [group for group in groups if group]
+
+
+# 定义一个辅助函数，读取本地清单文件中的 (大小, 相对路径) 条目，格式异常的行直接跳过。
+def _read_manifest_entries(manifest_path: Path) -> List[Tuple[int, str]]:
+    entries: List[Tuple[int, str]] = []
+    with manifest_path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            size_str, sep, relative_path = line.rstrip("\n").partition("\t")
+            if sep and relative_path and size_str.isdigit():
+                entries.append((int(size_str), relative_path))
+    return entries
+
+
+# 定义一个函数，按清单列出的文件用 rsync --files-from 下载，可分组通过同一条复用主连接并行运行多路 rsync。
+def download_from_manifest(
+    user: str,
+    host: str,
+    remote_dir: str,
+    local_dir: str,
+    manifest_path: Path,
+    keyfile: Optional[str] = None,
+    channels: int = 4,
+) -> bool:
+    """按清单下载，成功返回 True；条件不满足或任一分片失败时返回 False，由调用方回退到整体同步。
+
+    远端只需按列表逐个发送文件，不再递归遍历目录并匹配 include/exclude 规则。
+    """
+
+    # 依赖 rsync 的 --files-from，rsync 不可用时交由整体同步流程处理。
+    rsync_path = shutil.which("rsync") or os.environ.get("RSYNC_PATH")
+    if _RSYNC_UNUSABLE or not rsync_path:
+        return False
+    entries = _read_manifest_entries(manifest_path)
+    # 分片数不超过文件数；清单为空时交由整体同步流程处理。
+    groups = _partition_manifest(entries, max(min(channels, len(entries)), 1))
+    if not groups:
+        return False
+    destination = Path(local_dir).expanduser().resolve()
+    destination.mkdir(parents=True, exist_ok=True)
+    remote_target = f"{user}@{host}:{remote_dir.rstrip('/')}/"
+    ssh_command = _rsync_download_transport(user, host, keyfile)
+    console.print(
+        f"[green][file_transfer] 按清单使用 {len(groups)} 路 rsync 回传 {len(entries)} 个文件。[/green]"
+    )
+    # 在整个并行下载期间持有大流量主连接的引用：主连接登记在册，退出时由 close_all 关闭，
+    # 下载过程中也不会被回收线程停止。
+    with ssh_pool.acquire(user, host, keyfile, bulk=True):
+        # 多路 rsync 会同时启动，先建立大流量主连接，使各路共享同一次握手；
+        # 支持复用却无法建立时说明主机当前不可达，直接交由带重试的整体同步处理。
+        if len(groups) > 1 and ssh_pool.mux_supported() and not ssh_pool.warm_master(user, host, keyfile, bulk=True):
+            console.print("[yellow][file_transfer] 无法建立复用连接，改用整体同步回传。[/yellow]")
+            return False
+        # 每个分片的文件列表写入临时目录，结束后统一删除。
+        with tempfile.TemporaryDirectory(prefix="vultragent-fetch-") as list_dir:
+            list_paths: List[Path] = []
+            for index, group in enumerate(groups):
+                list_path = Path(list_dir) / f"part-{index}.txt"
+                list_path.write_text("\n".join(group) + "\n", encoding="utf-8")
+                list_paths.append(list_path)
+            # 各路 rsync 都是独立子进程，线程只负责等待其结束。
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(list_paths), thread_name_prefix="fetch-part"
+            ) as pool:
+                futures = [
+                    pool.submit(
+                        _run_rsync_download,
+                        rsync_path=rsync_path,
+                        ssh_command=ssh_command,
+                        remote_target=remote_target,
+                        local_dir=destination,
+                        pattern=None,
+                        files_from=list_path,
+                    )
+                    for list_path in list_paths
+                ]
+                failures = [future.exception() for future in futures if future.exception() is not None]
+    if failures:
+        console.print(
+            f"[yellow][file_transfer] {len(failures)} 路清单下载失败，改用整体同步补齐：{failures[0]}[/yellow]"
+        )
+        return False
+    return True
+
+
 # 定义一个内部函数用于执行单次 scp 下载。
 def _run_scp_download(
     user: str,
@@ -618,6 +749,8 @@ def _run_scp_download(
     # 若存在密钥文件则加入 -i 选项。
     if keyfile:
         scp_args.extend(["-i", keyfile])
+    # scp 同样复用大流量通道的主连接。
+    scp_args.extend(_mux_options(host, user, keyfile, bulk=True))
     # 组合远端源路径，使用 "." 结尾仅复制目录内容。
     remote_source = f"{user}@{host}:{remote_dir.rstrip('/')}/."
     # 将源与目标依次追加。
@@ -630,6 +763,29 @@ def _run_scp_download(
     subprocess.run(scp_args, check=True)
 
 
+# 定义一个辅助函数，构建下载时 rsync -e 使用的 SSH 子命令字符串。
+def _rsync_download_transport(user: str, host: str, keyfile: Optional[str]) -> str:
+    ssh_parts = [
+        "ssh",
+        "-o",
+        "BatchMode=yes",
+        "-o",
+        "StrictHostKeyChecking=no",
+        "-o",
+        "UserKnownHostsFile=/dev/null",
+    ]
+    # 若提供了密钥文件则追加。
+    if keyfile:
+        # 在 Windows 平台上，ssh/rsync 更倾向于识别 /cygdrive 风格的路径。
+        ssh_parts.extend(["-i", _format_local_path_for_rsync(_resolve_keyfile(keyfile))])
+    # 复用大流量通道的主连接，多次重试与后续下载共享一次握手。
+    ssh_parts.extend(_mux_options(host, user, keyfile, bulk=True))
+    # 将 SSH 参数拼接为字符串，保持逐项引用安全。
+    if os.name == "nt":
+        return subprocess.list2cmdline(ssh_parts)
+    return " ".join(shlex.quote(part) for part in ssh_parts)
+
+
 # 定义一个函数用于支持重试的下载流程。
 def download_with_retry(
     user: str,
@@ -656,28 +812,7 @@ def download_with_retry(
     # 构建远端目标字符串，末尾保留斜杠以复制目录内容。
     remote_target = f"{user}@{host}:{remote_dir.rstrip('/')}/"
     # 构建 SSH 子命令，供 rsync 的 -e 选项使用。
-    ssh_parts = [
-        "ssh",
-        "-o",
-        "BatchMode=yes",
-        "-o",
-        "StrictHostKeyChecking=no",
-        "-o",
-        "UserKnownHostsFile=/dev/null",
-    ]
-    # 若提供了密钥文件则追加。
-    formatted_keyfile: Optional[str] = None
-    if keyfile:
-        # 在 Windows 平台上，ssh/rsync 更倾向于识别 /cygdrive 风格的路径。
-        formatted_keyfile = _format_local_path_for_rsync(
-            Path(keyfile).expanduser().resolve()
-        )
-        ssh_parts.extend(["-i", formatted_keyfile])
-    # 将 SSH 参数拼接为字符串，保持逐项引用安全。
-    if os.name == "nt":
-        ssh_command = subprocess.list2cmdline(ssh_parts)
-    else:
-        ssh_command = " ".join(shlex.quote(part) for part in ssh_parts)
+    ssh_command = _rsync_download_transport(user, host, keyfile)
     # 计算允许的最大尝试次数（含首次尝试）。
     max_attempts = max(retries, 0) + 1
     # 逐次尝试下载直到成功或耗尽次数。
@@ -728,6 +863,8 @@ def download_with_retry(
                 )
             # 下载成功后在过滤模式下清理不匹配的文件。
             if pattern and not rsync_path:
+                # 通配模式只编译一次，逐个文件只做正则匹配；与 fnmatch 一致，先按平台规则规范化大小写。
+                matches_pattern = re.compile(translate(os.path.normcase(pattern))).match
                 for root, _, files in os.walk(destination):
                     for filename in files:
                         rel_path = os.path.relpath(
@@ -736,8 +873,8 @@ def download_with_retry(
                         if preserve_set and rel_path in preserve_set:
                             continue
                         if not (
-                            fnmatch(rel_path, pattern)
-                            or fnmatch(os.path.basename(rel_path), pattern)
+                            matches_pattern(os.path.normcase(rel_path))
+                            or matches_pattern(os.path.normcase(filename))
                         ):
                             os.remove(Path(root) / filename)
             # 成功完成后直接返回函数。
@@ -794,13 +931,14 @@ def verify_local_against_manifest(local_dir: str, manifest_path: str) -> Dict[st
             local_file = base_path / relative_path
             # 更新已检查计数。
             result["checked"] = int(result["checked"]) + 1
-            # 若文件不存在则记录缺失。
-            if not local_file.exists():
+            # 一次 stat 同时完成存在性判断与大小读取，文件不存在时记录缺失。
+            try:
+                actual_size = local_file.stat().st_size
+            except FileNotFoundError:
                 result["missing"].append(relative_path)
                 result["ok"] = False
                 continue
-            # 读取实际大小并与清单比对。
-            actual_size = local_file.stat().st_size
+            # 将实际大小与清单比对。
             if actual_size != expected_size:
                 result["size_mismatch"].append(
                     {
@@ -814,6 +952,42 @@ def verify_local_against_manifest(local_dir: str, manifest_path: str) -> Dict[st
     return result
 
 
+# 定义一个辅助函数，从同一实例上一次的回传目录中复制大小与清单一致的文件，避免重复下载。
+def _seed_from_previous_run(local_dir: Path, manifest_path: Path, manifest_name: str) -> List[str]:
+    """返回已从上一次回传结果复制到 ``local_dir`` 的相对路径列表。
+
+    只比对大小这一元数据，不读取文件内容；复制时保留修改时间，随后的 rsync 仍会按大小与修改时间复核，
+    远端内容若已变化则照常重新传输。
+    """
+
+    # 回传目录按时间戳命名，同级目录中名称最大的即为最近一次回传；
+    # 使用 os.scandir 一次读取目录项，is_dir 直接使用目录项自带的类型信息而无需逐项 stat。
+    with os.scandir(local_dir.parent) as entries:
+        previous_names = [
+            entry.name for entry in entries if entry.name != local_dir.name and entry.is_dir()
+        ]
+    if not previous_names:
+        return []
+    previous_dir = local_dir.parent / max(previous_names)
+    seeded: List[str] = []
+    for expected_size, relative_path in _read_manifest_entries(manifest_path):
+        if relative_path == manifest_name:
+            continue
+        source = previous_dir / relative_path
+        try:
+            # 大小不一致或文件不存在时直接留给 rsync 下载。
+            if source.stat().st_size != expected_size:
+                continue
+            target = local_dir / relative_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # 使用复制而非硬链接：rsync 以 --inplace 写入，硬链接会连带改写上一次的结果。
+            shutil.copy2(source, target)
+        except OSError:
+            continue
+        seeded.append(relative_path)
+    return seeded
+
+
 # 定义从远端回传结果目录的主函数。
 def fetch_results_from_remote(
     user: str,
@@ -828,6 +1002,7 @@ def fetch_results_from_remote(
     manifest_name: str = "_manifest.txt",
     remote_project_dir: Optional[str] = None,  # 远端项目根目录，可为空。
     remote_inputs_dir: Optional[str] = None,  # 远端音频目录，可为空。
+    parallel_channels: int = 1,  # 按清单下载时并行的 rsync 路数，1 表示单路。
 ) -> Dict[str, object]:
     # 初始化返回结构，默认表示未验证。
     summary: Dict[str, object] = {
@@ -837,6 +1012,7 @@ def fetch_results_from_remote(
         "missing": [],
         "size_mismatch": [],
         "manifest": None,
+        "skipped": [],
     }
     # 在回传前同样确保远端目录结构已经创建。
     ensure_remote_io_dirs(
@@ -887,19 +1063,36 @@ def fetch_results_from_remote(
                 f"[red][file_transfer] 下载清单失败：{exc}[/red]"
             )
             return summary
+    # 有清单且可使用 rsync 时，先复用上一次回传中大小未变化的文件，rsync 只需传输差异部分。
+    if summary["manifest"] and not _RSYNC_UNUSABLE and (shutil.which("rsync") or os.environ.get("RSYNC_PATH")):
+        summary["skipped"] = _seed_from_previous_run(
+            Path(local_results_dir), local_manifest_path, manifest_name
+        )
     # 下载远端输出目录。
     console.print("[blue][file_transfer] 开始回传远端结果目录……[/blue]")
-    download_with_retry(
+    # 已取得清单时按清单下载（可分片并行），清单本身已按下载模式过滤，成功后无需再整体同步。
+    manifest_ok = bool(summary["manifest"]) and download_from_manifest(
         user=user,
         host=host,
         remote_dir=remote_outputs_dir,
         local_dir=local_results_dir,
+        manifest_path=local_manifest_path,
         keyfile=keyfile,
-        pattern=pattern,
-        retries=retries,
-        backoff_sec=backoff_sec,
-        preserve=[manifest_name] if verify_manifest else None,
+        channels=parallel_channels,
     )
+    # 没有清单或按清单下载失败时整体同步目录，rsync 的增量传输会跳过已下载完成的文件。
+    if not manifest_ok:
+        download_with_retry(
+            user=user,
+            host=host,
+            remote_dir=remote_outputs_dir,
+            local_dir=local_results_dir,
+            keyfile=keyfile,
+            pattern=pattern,
+            retries=retries,
+            backoff_sec=backoff_sec,
+            preserve=[manifest_name] if verify_manifest else None,
+        )
     # 下载成功后标记成功。
     summary["ok"] = True
     # 在启用清单校验时执行比对。
@@ -916,8 +1109,15 @@ def fetch_results_from_remote(
 
 # 定义一个可选函数用于在远端轮转日志。
 def rotate_remote_log(user: str, host: str, log_path: str, keep: int, keyfile: Optional[str] = None) -> int:
-    # 构造 shell 命令，将当前日志重命名并删除多余备份。
-    command = (
+    # 在远端执行轮转命令。
+    result = _execute_remote(user=user, host=host, command=_rotate_log_script(log_path, keep), keyfile=keyfile)
+    # 根据返回码打印提示并返回退出码。
+    return _report_rotate_log(result["returncode"])
+
+
+# 定义一个辅助函数，构造将当前日志重命名并删除多余备份的 shell 命令。
+def _rotate_log_script(log_path: str, keep: int) -> str:
+    return (
         "set -euo pipefail; "
         f"LOG={shlex.quote(log_path)}; "
         "if [ -f \"$LOG\" ]; then "
@@ -929,15 +1129,15 @@ def rotate_remote_log(user: str, host: str, log_path: str, keep: int, keyfile: O
         "DIR=$(dirname \"$LOG\"); "
         f"ls -1t \"$DIR\"/run-*.log 2>/dev/null | tail -n +{keep + 1} | while read f; do rm -f \"$f\"; done"
     )
-    # 在远端执行命令。
-    result = _execute_remote(user=user, host=host, command=command, keyfile=keyfile)
-    # 根据返回码打印提示。
-    if result["returncode"] == 0:
+
+
+# 定义一个辅助函数，根据日志轮转的退出码输出提示。
+def _report_rotate_log(returncode: int) -> int:
+    if returncode == 0:
         console.print("[green][file_transfer] 已完成远端日志轮转。[/green]")
     else:
         console.print("[yellow][file_transfer] 日志轮转命令执行失败或日志不存在。[/yellow]")
-    # 返回退出码。
-    return result["returncode"]
+    return returncode
 
 
 # 定义一个可选函数用于清空远端输出目录。
@@ -964,20 +1164,25 @@ def cleanup_remote_directories(
     keyfile: Optional[str] = None,
 ) -> int:
     # 过滤空路径并去重，避免执行无意义的命令。
-    unique_dirs: List[str] = []
-    seen = set()
-    for path in directories:
-        if not path:
-            continue
-        if path in seen:
-            continue
-        seen.add(path)
-        unique_dirs.append(path)
+    unique_dirs = _unique_paths(directories)
     if not unique_dirs:
         console.print("[yellow][file_transfer] 未提供需要清理的远端目录。[/yellow]")
         return 0
-    dir_list = " ".join(shlex.quote(path) for path in unique_dirs)
-    command = (
+    result = _execute_remote(
+        user=user, host=host, command=_clear_directories_script(unique_dirs), keyfile=keyfile
+    )
+    return _report_clear_directories(result["returncode"], unique_dirs)
+
+
+# 定义一个辅助函数，过滤空路径并按出现顺序去重。
+def _unique_paths(paths: Sequence[str]) -> List[str]:
+    return list(dict.fromkeys(path for path in paths if path))
+
+
+# 定义一个辅助函数，构造清空若干远端目录内容（保留目录本身）的 shell 命令。
+def _clear_directories_script(directories: Sequence[str]) -> str:
+    dir_list = " ".join(shlex.quote(path) for path in directories)
+    return (
         "set -euo pipefail; "
         f"for DIR in {dir_list}; do "
         "if [ -d \"$DIR\" ]; then "
@@ -985,16 +1190,19 @@ def cleanup_remote_directories(
         "fi; "
         "done"
     )
-    result = _execute_remote(user=user, host=host, command=command, keyfile=keyfile)
-    if result["returncode"] == 0:
+
+
+# 定义一个辅助函数，根据目录清理的退出码输出提示。
+def _report_clear_directories(returncode: int, directories: Sequence[str]) -> int:
+    if returncode == 0:
         console.print(
-            f"[green][file_transfer] 已清空远端目录内容：{', '.join(unique_dirs)}。[/green]"
+            f"[green][file_transfer] 已清空远端目录内容：{', '.join(directories)}。[/green]"
         )
     else:
         console.print(
             "[yellow][file_transfer] 清理远端目录时出现问题，请检查路径是否存在。[/yellow]"
         )
-    return result["returncode"]
+    return returncode
 
 
 def cleanup_remote_logs(
@@ -1007,7 +1215,13 @@ def cleanup_remote_logs(
     if not log_path:
         console.print("[yellow][file_transfer] 未提供远端日志路径，跳过日志清理。[/yellow]")
         return 0
-    command = (
+    result = _execute_remote(user=user, host=host, command=_clear_logs_script(log_path), keyfile=keyfile)
+    return _report_clear_logs(result["returncode"])
+
+
+# 定义一个辅助函数，构造删除远端日志及其轮转备份的 shell 命令。
+def _clear_logs_script(log_path: str) -> str:
+    return (
         "set -euo pipefail; "
         f"LOG={shlex.quote(log_path)}; "
         "DIR=$(dirname \"$LOG\"); "
@@ -1019,12 +1233,72 @@ def cleanup_remote_logs(
         "if [ -f \"$FILE\" ]; then rm -f \"$FILE\"; fi; "
         "done"
     )
-    result = _execute_remote(user=user, host=host, command=command, keyfile=keyfile)
-    if result["returncode"] == 0:
+
+
+# 定义一个辅助函数，根据日志清理的退出码输出提示。
+def _report_clear_logs(returncode: int) -> int:
+    if returncode == 0:
         console.print("[green][file_transfer] 已清理远端日志及缓存文件。[/green]")
     else:
         console.print("[yellow][file_transfer] 清理远端日志缓存时遇到问题。[/yellow]")
-    return result["returncode"]
+    return returncode
+
+
+# 定义一个函数，把停止 tmux、日志轮转、目录清理与日志清理合并为一次 SSH 调用执行。
+def run_remote_cleanup(
+    *,
+    user: str,
+    host: str,
+    keyfile: Optional[str] = None,
+    session: str = "",
+    rotate_log_path: str = "",
+    keep_logs: int = 5,
+    directories: Sequence[str] = (),
+    clear_log_path: str = "",
+) -> Dict[str, int]:
+    """按给定参数组装清理步骤，在远端一次执行完毕，返回各步骤的退出码。
+
+    参数为空的步骤直接跳过；每个步骤在独立子 shell 中运行，单步失败不会中断其余步骤，
+    提示信息与逐个调用对应函数时一致。
+    """
+
+    unique_dirs = _unique_paths(directories)
+    # 依次收集 (步骤名, 远端命令)，顺序与逐个调用时保持一致。
+    steps: List[Tuple[str, str]] = []
+    if session:
+        steps.append(("tmux", _tmux_stop_command(session, missing_ok=True)))
+    if rotate_log_path:
+        steps.append(("rotate", _rotate_log_script(rotate_log_path, keep_logs)))
+    if unique_dirs:
+        steps.append(("directories", _clear_directories_script(unique_dirs)))
+    if clear_log_path:
+        steps.append(("logs", _clear_logs_script(clear_log_path)))
+    if not steps:
+        return {}
+    # 每个步骤放入子 shell，结束后输出带前缀的状态行，供本地解析各步骤的退出码。
+    script = " ".join(
+        f"( {command} ); printf '{_CLEANUP_STATUS_PREFIX}{name}:%d\\n' $?;"
+        for name, command in steps
+    )
+    result = _execute_remote(user=user, host=host, command=script, keyfile=keyfile)
+    # 解析状态行；连接失败等情况下缺失的步骤沿用整体退出码（至少为 1）。
+    fallback = int(result["returncode"]) or 1
+    codes: Dict[str, int] = {name: fallback for name, _ in steps}
+    for line in str(result["stdout"] or "").splitlines():
+        if line.startswith(_CLEANUP_STATUS_PREFIX):
+            name, _, code = line[len(_CLEANUP_STATUS_PREFIX):].partition(":")
+            if name in codes and code.isdigit():
+                codes[name] = int(code)
+    # 按步骤输出与单独调用时相同的提示，并返回归一化后的退出码。
+    if "tmux" in codes:
+        codes["tmux"] = _report_tmux_stop(user, host, session, codes["tmux"], missing_ok=True)
+    if "rotate" in codes:
+        _report_rotate_log(codes["rotate"])
+    if "directories" in codes:
+        _report_clear_directories(codes["directories"], unique_dirs)
+    if "logs" in codes:
+        _report_clear_logs(codes["logs"])
+    return codes
 
 
 # 定义用于部署或更新远端仓库的核心函数。
@@ -107,7 +107,8 @@ def upload_and_bootstrap(user: str, host: str, keyfile: str,
         temp_path = temp_file.name
 
     try:
-        # 调用 scp_upload 将临时脚本复制到远端指定路径。
+        # 调用 scp_upload 将临时脚本复制到远端指定路径：脚本很小且每次重新生成，增量传输无从节省；
+        # 引导阶段远端通常尚未安装 rsync，先试 rsync 只会多一次注定失败的往返。
         scp_upload(temp_path, remote_tmp_path, host, user=user, keyfile=keyfile or None)
     finally:
         # 无论上传是否成功，都尝试删除临时文件以避免残留。
@@ -1,70 +1,238 @@
 # core/remote_exec.py
 # 该模块提供基于系统 ssh/scp 命令的封装，方便其他模块调用远端指令。
 
+# 导入 concurrent.futures 模块用于在 SSH 探测期间并行收集本地环境信息。
+import concurrent.futures
+# 导入 functools 模块用于缓存状态文件的解析结果。
+import functools
+# 导入 io 模块用于构建带缓冲的日志写入器。
+import io
 # 导入 json 模块用于读取状态文件以确定实例信息。
 import json
 # 导入 os 模块用于处理路径与目录名。
 import os
 # 导入 platform 模块以检测操作系统类型并提供提示。
 import platform
+# 导入 queue 模块用于在 tail 读取线程与落盘线程之间传递数据块。
+import queue
+# 导入 shutil 模块用于定位 ssh 可执行文件的绝对路径。
+import shutil
 # 导入 signal 模块用于在终止日志追踪时向子进程发送信号。
 import signal
 # 导入 subprocess 模块以调用外部命令并捕获输出。
 import subprocess
-# 导入 threading 模块用于在后台执行周期性 rsync。
-import threading
 # 导入 time 模块用于线程休眠控制。
 import time
 # 导入 re 模块用于解析 ssh 输出中的错误关键字。
 import re
-# 导入 datetime.datetime 用于创建时间戳目录。
-from datetime import datetime
 # 导入 pathlib.Path 以便跨平台构建路径。
 from pathlib import Path
 # 导入 shlex 模块用于在记录日志时安全拼接命令。
 import shlex
-# 导入 typing 模块中的 Dict、Optional、Sequence、Tuple 类型用于类型注解。
-from typing import Dict, Optional, Sequence, Tuple
+# 导入 sys 模块以便直接写入标准输出。
+import sys
+# 导入 typing 模块中的 Dict、Iterable、Iterator、List、Optional、Sequence、Set、Tuple、Union 类型用于类型注解。
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
+# 可选依赖 orjson 用于更快地序列化诊断信息，未安装时回退到标准库 json。
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from core import ssh_pool
 from core.env_check import detect_local_rsync, diagnose_local_ssh_environment
 
 # 定义一个常量，指向远端诊断脚本的默认路径。
 _REMOTE_DIAGNOSE_SCRIPT = "/home/ubuntu/vultragentsvc/scripts/ssh_diagnose.sh"
+# 预编译常见 ssh 错误关键字的交替式，分组名即对应的错误标签。
+_SSH_ERROR_RE = re.compile(
+    r"(?P<timeout>Connection timed out)"
+    r"|(?P<permission>Permission denied)"
+    r"|(?P<noroute>No route to host)"
+    r"|(?P<refused>Connection refused)"
+    r"|(?P<hostkey>Host key verification failed)"
+    r"|(?P<network_unreachable>Network is unreachable)",
+    re.IGNORECASE,
+)
+# 定义远端脚本在 tmux 会话不存在时使用的退出码。
+_TMUX_SESSION_MISSING_CODE = 3
+# 定义日志镜像使用的模块级线程池，多次 tail 会话复用同一批工作线程。
+_MIRROR_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="log-mirror")
+# 定义 SSH 探测结束后等待本地环境检测结果的最长时间（秒）。
+_LOCAL_ENV_WAIT_SEC = 5
+# 定义开启 ssh 详细输出（-v）的环境变量名，默认关闭以减少诊断输出量。
+_SSH_DEBUG_ENV = "VULTRAGENT_SSH_DEBUG"
+# 定义状态文件路径，与 main.py 中的 STATE_PATH 指向同一文件，只在导入时解析一次。
+_STATE_PATH = Path(__file__).resolve().parent.parent / ".state.json"
+# 定义读取子进程管道时的块大小，按 64 KiB 批量读取以减少系统调用次数。
+_PIPE_CHUNK_SIZE = 64 * 1024
+# 定义轻量 tail 查看日志时先回放的末尾行数。
+_TAIL_VIEW_LINES = 200
+# 定义复用主连接在最后一个会话结束后继续保持的时长；空闲回收由 ssh_pool 负责，此值仅作兜底。
+_SSH_MUX_PERSIST = "600s"
+# 定义所有连接共用的保活选项，及时发现断线而不是让 tail 无限挂起。
+_SSH_KEEPALIVE_OPTIONS = (
+    "-o",
+    "ServerAliveInterval=30",
+    "-o",
+    "ServerAliveCountMax=3",
+    "-o",
+    "TCPKeepAlive=yes",
+)
+# 定义仅用于日志与文件传输等大流量通道的选项：文本日志压缩率高，并优先选用 AES-GCM。
+_SSH_BULK_OPTIONS = (
+    "-o",
+    "Compression=yes",
+    "-o",
+    "Ciphers=aes128-gcm@openssh.com,chacha20-poly1305@openssh.com,aes128-ctr,aes256-ctr",
+)
+# 定义远端安装 rsync 时按优先级尝试的包管理器及其安装命令。
+_RSYNC_INSTALL_COMMANDS = {
+    "apt": "sudo apt update && sudo apt install -y rsync",
+    "apt-get": "sudo apt-get update && sudo apt-get install -y rsync",
+    "yum": "sudo yum install -y rsync",
+    "dnf": "sudo dnf install -y rsync",
+    "pacman": "sudo pacman -Sy --noconfirm rsync",
+    "apk": "sudo apk add rsync",
+}
+# 定义在远端一次完成 rsync 检测、安装、复检与读取版本的脚本，结果以单行状态前缀输出。
+_RSYNC_ENSURE_SCRIPT = (
+    'if command -v rsync >/dev/null 2>&1; then '
+    'echo "RSYNC_OK:$(rsync --version | head -n 1)"; exit 0; fi; '
+    'tried=""; '
+    + "".join(
+        f'if command -v {manager} >/dev/null 2>&1; then tried="$tried {manager}"; '
+        f'{{ {command}; }} && command -v rsync >/dev/null 2>&1 '
+        f'&& {{ echo "RSYNC_INSTALLED:$(rsync --version | head -n 1)"; exit 0; }}; fi; '
+        for manager, command in _RSYNC_INSTALL_COMMANDS.items()
+    )
+    + 'echo "RSYNC_FAIL:tried=${tried# }"; exit 1'
+)
+# 定义远端 rsync 检测结果的缓存有效期（秒），过期后重新探测以应对环境变化。
+_REMOTE_RSYNC_TTL_SEC = 600.0
+# 缓存 (user, host, keyfile) -> (确认时间, 版本描述)，仅记录确认可用的结果。
+_remote_rsync_cache: Dict[Tuple[str, str, Optional[str]], Tuple[float, str]] = {}
+# 记录本进程内刚由 tmux 任务创建的远端日志 (user, host, log_file)。
+_FRESH_REMOTE_LOGS: Set[Tuple[str, str, str]] = set()
+# 预编译敏感环境变量名的匹配规则，命中时在展示命令中以 *** 替换取值。
+_SENSITIVE_KEY_RE = re.compile(r"token|secret|key", re.IGNORECASE)
+# 定义本地日志副本的刷新间隔（秒），崩溃时最多丢失该窗口内的数据。
+_LOCAL_FLUSH_INTERVAL_SEC = 0.2
+# 定义 tmux 会话探测结果的缓存有效期（秒），避免短时间内重复 SSH 往返。
+_TMUX_PROBE_TTL_SEC = 2.0
+# 缓存 (user, host, session) -> (探测时间, 会话是否存在) 的映射。
+_TMUX_PROBE_CACHE: Dict[Tuple[str, str, str], Tuple[float, bool]] = {}
+# 设置该环境变量为 1 可关闭探测缓存，便于测试或排查问题。
+_DISABLE_PROBE_CACHE_ENV = "VULTRAGENT_DISABLE_PROBE_CACHE"
+# 定义启动 tmux 任务的远端脚本，一次 SSH 往返内完成停止旧会话、创建日志目录与新建会话。
+# 会话名、日志目录与 tmux 内执行的命令均通过环境变量注入，避免再套一层引号。
+_TMUX_LAUNCH_SCRIPT = (
+    # kill-session 对不存在的会话同样安全，无需先用 has-session 探测；
+    # 若旧会话未能停止，随后的 new-session 会因重名失败并返回非零退出码。
+    'tmux kill-session -t "$VULTRAGENT_TMUX_SESSION" 2>/dev/null '
+    '&& echo "VULTRAGENT_TMUX_REPLACED=1"; '
+    'if [ -n "$VULTRAGENT_LOG_DIR" ]; then mkdir -p "$VULTRAGENT_LOG_DIR" '
+    '|| { echo "VULTRAGENT_LOG_DIR_FAILED=1"; exit 1; }; fi; '
+    'tmux new-session -d -s "$VULTRAGENT_TMUX_SESSION" "$VULTRAGENT_TMUX_COMMAND" '
+    # 在同一次往返中确认会话仍存在，命令立即退出时会话随之消失，这里即可发现。
+    '&& tmux has-session -t "$VULTRAGENT_TMUX_SESSION"'
+)
+
+
+def _format_ts_s(sep: str) -> str:
+    """返回形如 YYYYmmdd<sep>HHMMSS 的本地时间戳，直接拼接 struct_time 字段以省去 strftime 的格式解析。"""
+
+    lt = time.localtime()
+    return (
+        f"{lt.tm_year:04d}{lt.tm_mon:02d}{lt.tm_mday:02d}{sep}"
+        f"{lt.tm_hour:02d}{lt.tm_min:02d}{lt.tm_sec:02d}"
+    )
+
+
+class _LogSink:
+    """延迟创建的日志文件：段落先暂存在内存中，只有调用 keep() 后才创建目录并落盘。"""
+
+    def __init__(self, log_file: Path) -> None:
+        # 记录日志路径，便于在提示信息中展示。
+        self.path = log_file
+        # 尚未决定保留日志前暂存的段落内容。
+        self._pending: List[bytes] = []
+        # 底层文件句柄，在 keep() 之前保持为空。
+        self._handle: Optional[io.BufferedWriter] = None
+
+    @property
+    def kept(self) -> bool:
+        """日志是否已决定保留并写入磁盘。"""
+
+        return self._handle is not None
+
+    def keep(self) -> None:
+        """创建日志目录与文件，并写出此前暂存的全部段落。"""
+
+        if self._handle is not None:
+            return
+        # 按需创建日志目录，成功路径上不产生任何文件系统写入。
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 以追加模式打开底层文件，并包一层大缓冲写入器减少 write 调用次数。
+        self._handle = io.BufferedWriter(io.FileIO(str(self.path), "a"), buffer_size=65536)
+        self._handle.write(b"".join(self._pending))
+        self._pending.clear()
+
+    def write(self, text: str) -> None:
+        """以 UTF-8 编码写入一段文本。"""
 
+        data = text.encode("utf-8")
+        if self._handle is None:
+            self._pending.append(data)
+        else:
+            self._handle.write(data)
+
+    def close(self) -> None:
+        """刷新缓冲并关闭文件句柄，未保留的段落直接丢弃。"""
+
+        if self._handle is not None:
+            self._handle.close()
+        self._pending.clear()
+
+    def __enter__(self) -> "_LogSink":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+# 定义一个辅助函数，将数据序列化为带两空格缩进的 JSON 文本；orjson 可用时优先使用，输出与标准库一致。
+def _dump_json(data: object) -> str:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2)
 
-def _write_log_section(log_file: Path, title: str, content: str) -> None:
+
+def _write_log_section(log_sink: _LogSink, title: str, content: str) -> None:
     """在日志文件中追加带标题的内容段落。"""
 
-    # 以追加模式打开日志文件，确保多次写入不会覆盖之前内容。
-    with log_file.open("a", encoding="utf-8") as handle:
-        # 写入段落标题，统一使用 === 标记方便阅读。
-        handle.write(f"=== {title} ===\n")
-        # 如果内容非空，则原样写入日志文件。
-        if content:
-            handle.write(content)
-            # 如果内容末尾缺少换行，则补齐一行避免下一段粘连。
-            if not content.endswith("\n"):
-                handle.write("\n")
-        # 在段落末尾额外补充空行以增强可读性。
-        handle.write("\n")
+    # 写入段落标题，统一使用 === 标记方便阅读。
+    parts = [f"=== {title} ===\n"]
+    # 如果内容非空，则原样写入日志文件。
+    if content:
+        parts.append(content)
+        # 如果内容末尾缺少换行，则补齐一行避免下一段粘连。
+        if not content.endswith("\n"):
+            parts.append("\n")
+    # 在段落末尾额外补充空行以增强可读性。
+    parts.append("\n")
+    # 整个段落合并为一次缓冲写入。
+    log_sink.write("".join(parts))
 
 
 def _classify_ssh_error(output: str) -> Tuple[str, str]:
     """根据 ssh 输出识别错误类型并返回匹配到的关键短语。"""
 
-    # 定义常见错误关键字与对应的错误标签。
-    patterns = [
-        ("timeout", r"Connection timed out"),
-        ("permission", r"Permission denied"),
-        ("noroute", r"No route to host"),
-        ("refused", r"Connection refused"),
-        ("hostkey", r"Host key verification failed"),
-        ("network_unreachable", r"Network is unreachable"),
-    ]
-    # 遍历关键字列表，找到首个匹配的错误标签。
-    for label, pattern in patterns:
-        if re.search(pattern, output, re.IGNORECASE):
-            return label, pattern
+    # 使用预编译的分组交替式一次扫描输出，命中的分组名即为错误标签。
+    match = _SSH_ERROR_RE.search(output)
+    if match:
+        return match.lastgroup or "unknown", match.group()
     # 未匹配到任何已知错误时返回 unknown 标签。
     return "unknown", ""
 
@@ -75,7 +243,7 @@ def _run_remote_diagnose(
     port: int,
     keyfile: Optional[str],
     script_path: str,
-    log_file: Path,
+    log_sink: _LogSink,
 ) -> Dict[str, str]:
     """尝试通过 SSH 调用远端诊断脚本并记录输出。"""
 
@@ -99,7 +267,7 @@ def _run_remote_diagnose(
     ssh_args.append(remote_command)
     # 在日志中记录即将执行的诊断命令，帮助用户回溯问题。
     _write_log_section(
-        log_file,
+        log_sink,
         "remote_diagnose_command",
         " ".join(shlex.quote(part) for part in ssh_args),
     )
@@ -109,7 +277,7 @@ def _run_remote_diagnose(
     except Exception as exc:  # noqa: BLE001 - 需捕获所有异常用于提示
         # 当命令执行失败时记录异常信息，便于分析根因。
         failure_message = f"调用远端诊断脚本失败：{exc}"
-        _write_log_section(log_file, "remote_diagnose_error", failure_message)
+        _write_log_section(log_sink, "remote_diagnose_error", failure_message)
         # 返回执行失败的摘要信息给上层调用者。
         return {
             "ran": "false",
@@ -120,7 +288,7 @@ def _run_remote_diagnose(
     # 合并 stdout 与 stderr 便于统一写入日志。
     combined = (proc.stdout or "") + (proc.stderr or "")
     # 将命令输出写入日志文件供用户查阅详情。
-    _write_log_section(log_file, "remote_diagnose_output", combined)
+    _write_log_section(log_sink, "remote_diagnose_output", combined)
     # 构造执行结果摘要以供 check_ssh_connection 使用。
     return {
         "ran": "true",
@@ -148,178 +316,212 @@ def check_ssh_connection(
     if not user:
         print("[remote_exec] ❌ 未提供 SSH 用户名，无法执行连通性检测。")
         return {"ok": "false", "reason": "missing_user"}
-    # 创建日志目录并生成带时间戳的日志文件名。
+    # 生成带时间戳的日志文件名，目录与文件只在需要保留日志时才创建。
     logs_dir = Path("logs")
-    logs_dir.mkdir(parents=True, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = _format_ts_s("_")
     log_file = logs_dir / f"ssh_check_{timestamp}.log"
-    # 初始化日志文件，写入简单的标头以区分不同段落。
-    log_file.write_text("=== ssh_check ===\n\n", encoding="utf-8")
-    # 构建 ssh 命令基础参数，开启详细输出以捕获错误原因。
-    ssh_args = [
-        "ssh",
-        "-v",
-        "-o",
-        "BatchMode=yes",
-        "-o",
-        "StrictHostKeyChecking=no",
-        "-o",
-        f"ConnectTimeout={timeout}",
-        "-p",
-        str(port),
-    ]
-    # 若提供私钥则追加 -i 参数以指定凭据。
-    if keyfile:
-        ssh_args.extend(["-i", keyfile])
-    # 组合远端目标并附加 exit 命令用于快速验证。
-    ssh_args.append(f"{user}@{host}")
-    ssh_args.append("exit")
-    # 将最终命令写入日志，方便用户复现。
-    _write_log_section(
-        log_file,
-        "ssh_command",
-        " ".join(shlex.quote(part) for part in ssh_args),
-    )
-    # 在控制台告知用户检测目标与端口。
-    print(f"[CHECK] 正在检测 SSH 连接：{user}@{host}:{port}")
-    try:
-        # 运行 ssh 命令并捕获输出内容。
-        proc = subprocess.run(ssh_args, capture_output=True, text=True)
-    except FileNotFoundError:
-        # 当本地缺少 ssh 命令时，提示用户安装并记录日志。
-        message = "本地未找到 ssh 命令，请先安装 OpenSSH 客户端。"
-        print(f"[remote_exec] ❌ {message}")
-        _write_log_section(log_file, "ssh_error", message)
-        print(f"\n📁 详细日志已保存：{log_file}")
-        return {"ok": "false", "reason": "ssh_not_found"}
-    # 将 ssh 输出合并后写入日志文件。
-    combined_output = (proc.stdout or "") + (proc.stderr or "")
-    _write_log_section(log_file, "ssh_output", combined_output)
-    # 使用辅助函数识别错误类型并拿到匹配到的关键短语。
-    error_label, matched_keyword = _classify_ssh_error(combined_output)
-    # 根据返回码判断是否需要输出成功提示。
-    if proc.returncode == 0:
-        print("✅ SSH 检测通过，远端可正常建立连接。")
-    else:
-        # 针对不同错误标签输出个性化的排障建议。
-        if error_label == "timeout":
-            print("\n❌ SSH 连接超时，可能原因如下：")
-            print("  1️⃣ VPS SSH 服务未运行 → 尝试执行：sudo systemctl restart ssh")
-            print("  2️⃣ 防火墙未放行 22 端口 → 运行：sudo ufw allow 22/tcp && sudo ufw reload")
-            print("  3️⃣ 云防火墙未放行 22 → 检查 Vultr Firewall Group 规则。")
-            print("  4️⃣ 本地网络屏蔽 22 → 尝试切换其他网络或手机热点。")
-            print("  5️⃣ SSH 端口被修改 → 检查 /etc/ssh/sshd_config 中的 Port。")
-            print("\n🧩 已自动尝试执行远端诊断脚本，详见日志。")
-        elif error_label == "permission":
-            print("\n⚠️ 登录失败：密钥或用户信息可能不正确。")
-            print("  - 请确认当前使用的用户是否正确（如 ubuntu / root）。")
-            print("  - 请确认私钥与 Vultr 面板中的公钥匹配。")
-            print("  - 若 VPS 禁用 root 登录，尝试改用普通用户。")
-        elif error_label == "noroute":
-            print("\n🚫 无法路由到主机，说明网络不通或路由异常。")
-            print("  - 请检查实例是否正在运行且网络接口已启用。")
-            print("  - 若使用内网 IP，请改用公网 IP。")
-            print("  - 可在 Vultr 控制台确认实例网络状态。")
-            print("\n🧩 已自动尝试执行远端诊断脚本，详见日志。")
-        elif error_label == "refused":
-            print("\n🔒 目标拒绝连接，可能是 SSH 服务未监听指定端口。")
-            print("  - 可执行 sudo systemctl enable --now ssh 恢复服务。")
-            print("  - 请确认 sshd_config 中的 Port 与本次检测端口一致。")
-            print("\n🧩 已自动尝试执行远端诊断脚本，详见日志。")
-        elif error_label == "hostkey":
-            print("\n⚠️ Host key 验证失败，建议清理已缓存的 known_hosts 记录。")
-            print(f"  - 可执行 ssh-keygen -R {host} 然后重试连接。")
-            print("  - 若实例重装后 IP 未变化，需要重新接受新的指纹。")
-        elif error_label == "network_unreachable":
-            print("\n🚫 本地网络不可达目标主机，请检查当前网络环境。")
-            print("  - 可尝试切换到其他网络，或检查本地路由配置。")
-        else:
-            print("\n❌ SSH 检测失败，未识别的错误类型。请查阅日志获取更多细节。")
-        print(f"\n[remote_exec] ssh 返回码：{proc.returncode}，匹配关键字：{matched_keyword or '无'}")
-    # 调用环境检测函数收集本地端口与防火墙信息。
-    local_env = diagnose_local_ssh_environment(host=host, port=port)
-    # 将环境信息写入日志以便后续分析。
-    _write_log_section(log_file, "local_environment", json.dumps(local_env, ensure_ascii=False, indent=2))
-    # 如果检测结果显示端口不可达，则在控制台给出提示。
-    reachability = local_env.get("port_reachability", "unknown")
-    if reachability != "reachable":
-        print("\n[remote_exec] ⚠️ 本地端口检测结果提示连接可能受限，请检查网络或防火墙。")
-    # 根据错误标签决定是否触发远端诊断脚本。
-    if error_label in {"timeout", "noroute", "refused", "network_unreachable"}:
-        diagnose_result = _run_remote_diagnose(
-            user=user,
-            host=host,
-            port=port,
-            keyfile=keyfile,
-            script_path=remote_script,
-            log_file=log_file,
+    # 是否处于调试模式，调试时无论成败都保留完整日志。
+    debug = bool(os.environ.get(_SSH_DEBUG_ENV))
+    # 诊断过程中的所有段落先暂存，确认需要保留时才落盘。
+    with _LogSink(log_file) as log_sink:
+        # 初始化日志文件，写入简单的标头以区分不同段落。
+        log_sink.write("=== ssh_check ===\n\n")
+        # 构建 ssh 命令基础参数，错误分类所需的提示无需 -v 也会输出。
+        ssh_args = [
+            "ssh",
+            "-o",
+            "BatchMode=yes",
+            "-o",
+            "StrictHostKeyChecking=no",
+            "-o",
+            f"ConnectTimeout={timeout}",
+            "-p",
+            str(port),
+        ]
+        # 仅在设置调试环境变量时开启详细输出，便于排查握手细节。
+        if os.environ.get(_SSH_DEBUG_ENV):
+            ssh_args.insert(1, "-v")
+        # 若提供私钥则追加 -i 参数以指定凭据。
+        if keyfile:
+            ssh_args.extend(["-i", keyfile])
+        # 组合远端目标并附加 exit 命令用于快速验证。
+        ssh_args.append(f"{user}@{host}")
+        ssh_args.append("exit")
+        # 将最终命令写入日志，方便用户复现。
+        _write_log_section(
+            log_sink,
+            "ssh_command",
+            " ".join(shlex.quote(part) for part in ssh_args),
         )
-        # 根据返回值在终端输出执行情况摘要。
-        if diagnose_result.get("ran") == "true":
-            print("\n[remote_exec] 已尝试远端诊断脚本，请查看日志了解详细输出。")
-            if diagnose_result.get("returncode") != "0":
-                print(
-                    "[remote_exec] ⚠️ 远端诊断脚本返回非零退出码，可能需要手动登录进一步排查。"
-                )
+        # 在控制台告知用户检测目标与端口。
+        print(f"[CHECK] 正在检测 SSH 连接：{user}@{host}:{port}")
+        # 本地端口与防火墙检测与 ssh 探测互不依赖，提前在后台线程中并行执行。
+        env_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="ssh-check-env")
+        local_env_future = env_executor.submit(diagnose_local_ssh_environment, host=host, port=port)
+        # 不再提交新任务，线程在检测完成后自行退出，提前返回时也不会阻塞。
+        env_executor.shutdown(wait=False)
+        try:
+            # 运行 ssh 命令并捕获输出内容。
+            proc = subprocess.run(ssh_args, capture_output=True, text=True)
+        except FileNotFoundError:
+            # 当本地缺少 ssh 命令时，提示用户安装并记录日志。
+            message = "本地未找到 ssh 命令，请先安装 OpenSSH 客户端。"
+            print(f"[remote_exec] ❌ {message}")
+            _write_log_section(log_sink, "ssh_error", message)
+            log_sink.keep()
+            print(f"\n📁 详细日志已保存：{log_file}")
+            return {"ok": "false", "reason": "ssh_not_found"}
+        # 将 ssh 输出合并后写入日志文件。
+        combined_output = (proc.stdout or "") + (proc.stderr or "")
+        _write_log_section(log_sink, "ssh_output", combined_output)
+        # 使用辅助函数识别错误类型并拿到匹配到的关键短语。
+        error_label, matched_keyword = _classify_ssh_error(combined_output)
+        # 根据返回码判断是否需要输出成功提示。
+        if proc.returncode == 0:
+            print("✅ SSH 检测通过，远端可正常建立连接。")
         else:
-            print("\n[remote_exec] ⚠️ 未能调用远端诊断脚本：")
-            print(f"  {diagnose_result.get('error', '未知错误')}")
-    # 在控制台提示日志保存位置，方便用户查看详细报告。
-    print(f"\n📁 详细日志已保存：{log_file}")
-    # 返回执行摘要供调用方在需要时进一步处理。
-    return {
-        "ok": "true" if proc.returncode == 0 else "false",
-        "error": error_label,
-        "log_file": str(log_file),
-    }
+            # 针对不同错误标签输出个性化的排障建议。
+            if error_label == "timeout":
+                print("\n❌ SSH 连接超时，可能原因如下：")
+                print("  1️⃣ VPS SSH 服务未运行 → 尝试执行：sudo systemctl restart ssh")
+                print("  2️⃣ 防火墙未放行 22 端口 → 运行：sudo ufw allow 22/tcp && sudo ufw reload")
+                print("  3️⃣ 云防火墙未放行 22 → 检查 Vultr Firewall Group 规则。")
+                print("  4️⃣ 本地网络屏蔽 22 → 尝试切换其他网络或手机热点。")
+                print("  5️⃣ SSH 端口被修改 → 检查 /etc/ssh/sshd_config 中的 Port。")
+                print("\n🧩 已自动尝试执行远端诊断脚本，详见日志。")
+            elif error_label == "permission":
+                print("\n⚠️ 登录失败：密钥或用户信息可能不正确。")
+                print("  - 请确认当前使用的用户是否正确（如 ubuntu / root）。")
+                print("  - 请确认私钥与 Vultr 面板中的公钥匹配。")
+                print("  - 若 VPS 禁用 root 登录，尝试改用普通用户。")
+            elif error_label == "noroute":
+                print("\n🚫 无法路由到主机，说明网络不通或路由异常。")
+                print("  - 请检查实例是否正在运行且网络接口已启用。")
+                print("  - 若使用内网 IP，请改用公网 IP。")
+                print("  - 可在 Vultr 控制台确认实例网络状态。")
+                print("\n🧩 已自动尝试执行远端诊断脚本，详见日志。")
+            elif error_label == "refused":
+                print("\n🔒 目标拒绝连接，可能是 SSH 服务未监听指定端口。")
+                print("  - 可执行 sudo systemctl enable --now ssh 恢复服务。")
+                print("  - 请确认 sshd_config 中的 Port 与本次检测端口一致。")
+                print("\n🧩 已自动尝试执行远端诊断脚本，详见日志。")
+            elif error_label == "hostkey":
+                print("\n⚠️ Host key 验证失败，建议清理已缓存的 known_hosts 记录。")
+                print(f"  - 可执行 ssh-keygen -R {host} 然后重试连接。")
+                print("  - 若实例重装后 IP 未变化，需要重新接受新的指纹。")
+            elif error_label == "network_unreachable":
+                print("\n🚫 本地网络不可达目标主机，请检查当前网络环境。")
+                print("  - 可尝试切换到其他网络，或检查本地路由配置。")
+            else:
+                print("\n❌ SSH 检测失败，未识别的错误类型。请查阅日志获取更多细节。")
+            print(f"\n[remote_exec] ssh 返回码：{proc.returncode}，匹配关键字：{matched_keyword or '无'}")
+        # 取回并行收集的本地端口与防火墙信息，超时时仅记录基础信息。
+        try:
+            local_env = local_env_future.result(timeout=_LOCAL_ENV_WAIT_SEC)
+        except concurrent.futures.TimeoutError:
+            local_env = {"host": host, "port": str(port), "port_reachability": "unknown"}
+        reachability = local_env.get("port_reachability", "unknown")
+        # 连接失败、端口异常或调试模式下才保留日志；一切正常时不写任何文件。
+        if proc.returncode != 0 or reachability != "reachable" or debug:
+            log_sink.keep()
+            # 将环境信息写入日志以便后续分析。
+            _write_log_section(log_sink, "local_environment", _dump_json(local_env))
+        # 如果检测结果显示端口不可达，则在控制台给出提示。
+        if reachability != "reachable":
+            print("\n[remote_exec] ⚠️ 本地端口检测结果提示连接可能受限，请检查网络或防火墙。")
+        # 根据错误标签决定是否触发远端诊断脚本。
+        if error_label in {"timeout", "noroute", "refused", "network_unreachable"}:
+            diagnose_result = _run_remote_diagnose(
+                user=user,
+                host=host,
+                port=port,
+                keyfile=keyfile,
+                script_path=remote_script,
+                log_sink=log_sink,
+            )
+            # 根据返回值在终端输出执行情况摘要。
+            if diagnose_result.get("ran") == "true":
+                print("\n[remote_exec] 已尝试远端诊断脚本，请查看日志了解详细输出。")
+                if diagnose_result.get("returncode") != "0":
+                    print(
+                        "[remote_exec] ⚠️ 远端诊断脚本返回非零退出码，可能需要手动登录进一步排查。"
+                    )
+            else:
+                print("\n[remote_exec] ⚠️ 未能调用远端诊断脚本：")
+                print(f"  {diagnose_result.get('error', '未知错误')}")
+        # 在控制台提示日志保存位置，方便用户查看详细报告。
+        if log_sink.kept:
+            print(f"\n📁 详细日志已保存：{log_file}")
+        # 返回执行摘要供调用方在需要时进一步处理，未保留日志时路径为空。
+        return {
+            "ok": "true" if proc.returncode == 0 else "false",
+            "error": error_label,
+            "log_file": str(log_file) if log_sink.kept else "",
+        }
+
+
+@functools.lru_cache(maxsize=1)
+def _ssh_executable() -> str:
+    """返回 ssh 可执行文件的绝对路径，找不到时（或在 Windows 上）退回命令名。"""
+
+    # posix_spawn 仅在类 Unix 平台可用，Windows 保持原样以免路径中的空格影响 rsync -e。
+    if os.name == "nt":
+        return "ssh"
+    return shutil.which("ssh") or "ssh"
 
 
 def _remote_command_available(ssh_args: Sequence[str], command: str) -> bool:
     """检测远端是否存在指定命令。"""
 
-    check_cmd = list(ssh_args) + ["command", "-v", command]
+    # ssh_args 以 ssh 的绝对路径开头，配合 close_fds=False 使 CPython 可以走
+    # posix_spawn 快速路径，省去 fork 复制页表的开销；此处只关心退出码，输出全部丢弃。
+    check_cmd = (*ssh_args, "command", "-v", command)
     try:
-        result = subprocess.run(check_cmd, capture_output=True, text=True)
+        result = subprocess.run(
+            check_cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=False,
+        )
     except Exception as exc:  # noqa: BLE001 - 捕获所有异常用于输出日志
         print(f"[ERROR] 检测远端命令 {command} 时失败：{exc}")
         return False
     return result.returncode == 0
 
 
+def _detect_remote_commands(ssh_args: Sequence[str], commands: Iterable[str]) -> List[str]:
+    """在单次 SSH 调用中检测多个远端命令，返回存在的命令名列表。"""
+
+    probe_script = (
+        f"for m in {' '.join(shlex.quote(name) for name in commands)}; do "
+        'command -v "$m" >/dev/null 2>&1 && echo "$m"; done; true'
+    )
+    try:
+        result = subprocess.run((*ssh_args, probe_script), capture_output=True, text=True)
+    except Exception as exc:  # noqa: BLE001 - 捕获所有异常用于输出日志
+        print(f"[ERROR] 检测远端命令时失败：{exc}")
+        return []
+    if result.returncode != 0:
+        return []
+    return result.stdout.split()
+
+
 def _attempt_remote_install(host: str, user: str, keyfile: Optional[str]) -> bool:
     """尝试使用常见包管理器在远端安装 rsync。"""
 
-    ssh_args = list(_base_ssh_args(host, user, keyfile))
-
-    install_sequences = [
-        (
-            "apt",
-            "bash -lc \"sudo apt update && sudo apt install -y rsync\"",
-        ),
-        (
-            "apt-get",
-            "bash -lc \"sudo apt-get update && sudo apt-get install -y rsync\"",
-        ),
-        (
-            "yum",
-            "bash -lc \"sudo yum install -y rsync\"",
-        ),
-        (
-            "dnf",
-            "bash -lc \"sudo dnf install -y rsync\"",
-        ),
-        (
-            "pacman",
-            "bash -lc \"sudo pacman -Sy --noconfirm rsync\"",
-        ),
-        (
-            "apk",
-            "bash -lc \"sudo apk add rsync\"",
-        ),
-    ]
+    ssh_args = _base_ssh_args(host, user, keyfile)
+
+    install_sequences = {
+        manager: f"bash -lc {shlex.quote(command)}"
+        for manager, command in _RSYNC_INSTALL_COMMANDS.items()
+    }
+
+    # 一次 SSH 往返即可列出远端全部可用的包管理器，保留按优先级逐个尝试的行为。
+    available = set(_detect_remote_commands(ssh_args, install_sequences))
 
-    for manager, install_cmd in install_sequences:
-        if not _remote_command_available(ssh_args, manager):
+    for manager, install_cmd in install_sequences.items():
+        if manager not in available:
             continue
         print(f"[INSTALL] 检测到远端包管理器 {manager}，尝试安装 rsync …")
         try:
@@ -341,14 +543,10 @@ def _attempt_remote_install(host: str, user: str, keyfile: Optional[str]) -> boo
             continue
 
         if _remote_command_available(ssh_args, "rsync"):
-            version_cmd = list(ssh_args) + ["rsync", "--version"]
+            version_cmd = (*ssh_args, "rsync", "--version")
             try:
                 version_result = subprocess.run(version_cmd, capture_output=True, text=True)
-                version_line = (
-                    version_result.stdout.splitlines()[0]
-                    if version_result.stdout
-                    else "rsync"
-                )
+                version_line = version_result.stdout.partition("\n")[0] or "rsync"
             except Exception:  # noqa: BLE001 - 若读取版本失败，使用默认描述
                 version_line = "rsync"
             print(f"[OK] 已在远端安装 rsync：{version_line}")
@@ -358,6 +556,19 @@ def _attempt_remote_install(host: str, user: str, keyfile: Optional[str]) -> boo
     return False
 
 
+def _remember_remote_rsync(user: str, host: str, keyfile: Optional[str], version: str) -> None:
+    """记录远端 rsync 已确认可用，供日志镜像等流程跳过重复探测。"""
+
+    _remote_rsync_cache[(user, host, keyfile)] = (time.monotonic(), version)
+
+
+def _remote_rsync_known(user: str, host: str, keyfile: Optional[str]) -> bool:
+    """判断缓存中是否存在未过期的远端 rsync 可用记录。"""
+
+    cached = _remote_rsync_cache.get((user, host, keyfile))
+    return cached is not None and time.monotonic() - cached[0] < _REMOTE_RSYNC_TTL_SEC
+
+
 def install_remote_rsync(user: str, host: str, keyfile: Optional[str] = None) -> bool:
     """通过 SSH 检测并在必要时安装远端 rsync。"""
 
@@ -370,118 +581,338 @@ def install_remote_rsync(user: str, host: str, keyfile: Optional[str] = None) ->
         return False
 
     # 构建 ssh 基础参数列表，后续命令在此基础上附加远端指令。
-    ssh_args = list(_base_ssh_args(host, user, keyfile))
-
-    # 打印检测提示，保持与其它日志格式一致。
-    print("[CHECK] 正在检测远端 rsync ...")
-    # 若命令返回码为 0，表示远端已安装 rsync。
-    if _remote_command_available(ssh_args, "rsync"):
-        # 进一步查询远端 rsync 版本并输出。
-        version_cmd = ssh_args + ["rsync", "--version"]
-        try:
-            version_result = subprocess.run(version_cmd, capture_output=True, text=True)
-            version_line = version_result.stdout.splitlines()[0] if version_result.stdout else "rsync"
-        except Exception:
-            version_line = "rsync"
-        print(f"[OK] 远端 rsync 已存在：{version_line}")
-        return True
+    ssh_args = _base_ssh_args(host, user, keyfile)
+
+    # 在整个检测与安装过程中持有主连接引用，多次探测共享同一连接。
+    with ssh_pool.acquire(user, host, keyfile):
+        # 打印检测提示，保持与其它日志格式一致。
+        print("[CHECK] 正在检测远端 rsync ...")
+        # 检测、安装、复检与读取版本全部在远端一次完成，只需一次 SSH 往返。
+        result = run_ssh_command(
+            host=host,
+            user=user,
+            keyfile=keyfile,
+            command=["bash", "-lc", _RSYNC_ENSURE_SCRIPT],
+            # 只解析末尾的状态行，包管理器的大量安装输出无需完整保留。
+            max_capture=_PIPE_CHUNK_SIZE,
+        )
+        # 取最后一条带状态前缀的输出行作为结论。
+        status, _, detail = next(
+            (
+                line.partition(":")
+                for line in reversed((result.stdout or "").splitlines())
+                if line.startswith(("RSYNC_OK:", "RSYNC_INSTALLED:", "RSYNC_FAIL:"))
+            ),
+            ("", "", ""),
+        )
+        if status == "RSYNC_OK":
+            print(f"[OK] 远端 rsync 已存在：{detail or 'rsync'}")
+            _remember_remote_rsync(user, host, keyfile, detail or "rsync")
+            return True
+        if status == "RSYNC_INSTALLED":
+            print(f"[OK] 已在远端安装 rsync：{detail or 'rsync'}")
+            _remember_remote_rsync(user, host, keyfile, detail or "rsync")
+            return True
+        if status == "RSYNC_FAIL":
+            print(f"[FAIL] 已尝试所有自动方案，仍未能在远端安装 rsync（{detail}）。")
+            print("[HINT] 请手动连接远端执行安装命令后重试。")
+            return False
 
-    print("[WARN] 远端未检测到 rsync，尝试自动安装 …")
+        # 远端脚本未给出结论（例如缺少 bash）时，退回逐步检测与安装的流程。
+        print("[WARN] 未能解析远端检测结果，改为逐步检测 rsync …")
+        if _remote_command_available(ssh_args, "rsync"):
+            print("[OK] 远端 rsync 已存在。")
+            _remember_remote_rsync(user, host, keyfile, "rsync")
+            return True
 
-    if _attempt_remote_install(host, user, keyfile):
-        return True
+        print("[WARN] 远端未检测到 rsync，尝试自动安装 …")
 
-    print("[FAIL] 已尝试所有自动方案，仍未能在远端安装 rsync。")
-    print("[HINT] 请手动连接远端执行安装命令后重试。")
-    return False
+        if _attempt_remote_install(host, user, keyfile):
+            _remember_remote_rsync(user, host, keyfile, "rsync")
+            return True
+
+        print("[FAIL] 已尝试所有自动方案，仍未能在远端安装 rsync。")
+        print("[HINT] 请手动连接远端执行安装命令后重试。")
+        return False
 
 # 定义一个辅助函数，用于组装 ssh 目标字符串。
 def _build_target(host: str, user: Optional[str]) -> str:
     # 如果提供了用户名，则拼接成 user@host 形式，否则仅返回主机名。
     return f"{user}@{host}" if user else host
 
-# 定义一个辅助函数，用于构建 ssh 命令的公共参数列表。
-def _base_ssh_args(host: str, user: Optional[str], keyfile: Optional[str]) -> Sequence[str]:
-    # 从基础命令 ssh 开始，并启用 BatchMode 避免交互式提示。
-    args = [
-        "ssh",
+# 定义关闭复用主连接的函数，供调用方在切换实例或结束操作时主动释放连接。
+def close_ssh_mux(user: Optional[str], host: str, keyfile: Optional[str] = None) -> None:
+    # 控制通道与大流量通道各有一条主连接，需要分别关闭。
+    target = _build_target(host, user)
+    ssh_pool.close_master(target, keyfile=keyfile)
+    ssh_pool.close_master(target, bulk=True, keyfile=keyfile)
+
+# 定义一个辅助函数，返回 ssh/scp/rsync 共用的 -o 选项。
+def _common_ssh_options(host: str, user: Optional[str], bulk: bool = False,
+                        keyfile: Optional[str] = None) -> List[str]:
+    """构建公共连接选项，在类 Unix 平台上额外启用 ControlMaster 连接复用。
+
+    ``bulk`` 为 True 时用于日志追踪与文件传输，额外开启压缩并调整加密算法。
+    """
+
+    # 启用 BatchMode 避免交互式提示，并跳过主机指纹校验。
+    options = [
         "-o",
         "BatchMode=yes",
         "-o",
         "StrictHostKeyChecking=no",
         "-o",
         "UserKnownHostsFile=/dev/null",
+        *_SSH_KEEPALIVE_OPTIONS,
     ]
+    # 控制类命令的载荷很小，压缩只会徒增开销，因此仅对大流量通道启用。
+    if bulk:
+        options.extend(_SSH_BULK_OPTIONS)
+    # 追加连接复用选项（平台不支持时为空）。
+    options.extend(_mux_options(host, user, keyfile, bulk))
+    return options
+
+# 定义一个辅助函数，返回启用 ControlMaster 连接复用所需的选项，供自行拼装 ssh/scp 参数的模块复用。
+def _mux_options(host: str, user: Optional[str], keyfile: Optional[str] = None,
+                 bulk: bool = False) -> List[str]:
+    # Windows 自带的 OpenSSH 不支持 ControlMaster，套接字目录在导入时创建失败时同样返回空列表。
+    if not ssh_pool.mux_supported():
+        return []
+    # 首个连接成为主连接，后续 ssh/scp/rsync 直接复用同一 TCP 与认证会话。
+    return [
+        "-o",
+        "ControlMaster=auto",
+        "-o",
+        f"ControlPath={ssh_pool.control_path(_build_target(host, user), bulk, keyfile=keyfile)}",
+        "-o",
+        f"ControlPersist={_SSH_MUX_PERSIST}",
+    ]
+
+# 定义一个辅助函数，用于构建 ssh 命令的公共参数元组，按目标缓存避免重复构造。
+@functools.lru_cache(maxsize=256)
+def _base_ssh_args(host: str, user: Optional[str], keyfile: Optional[str],
+                   bulk: bool = False) -> Tuple[str, ...]:
+    # 从 ssh 的绝对路径开始，并附加公共连接选项。
+    args = [_ssh_executable(), *_common_ssh_options(host, user, bulk, keyfile)]
     # 若提供了私钥路径，则加入 -i 参数。
     if keyfile:
         args.extend(["-i", keyfile])
     # 拼接目标主机字符串。
     args.append(_build_target(host, user))
-    # 返回最终的参数序列。
-    return args
+    # 以不可变元组返回，调用方通过解包追加远端命令而无需复制。
+    return tuple(args)
+
+# 定义一个辅助函数，返回 rsync -e 所需的 ssh 传输命令字符串，同样按目标缓存。
+@functools.lru_cache(maxsize=256)
+def _ssh_transport(host: str, user: Optional[str], keyfile: Optional[str]) -> str:
+    # 基于大流量通道的 ssh 参数（去掉末尾的目标）逐项转义后拼接。
+    return " ".join(shlex.quote(part) for part in _base_ssh_args(host, user, keyfile, bulk=True)[:-1])
+
+# 定义一个辅助函数，按块读取子进程输出并返回以换行结尾的原始字节块。
+def _iter_raw_chunks(process: subprocess.Popen, partial: bool = False) -> Iterator[bytes]:
+    """以 64 KiB 为单位读取管道输出，不做任何解码。
+
+    默认仅在行边界处切分，除最后一块外每块都以换行结尾，多字节 UTF-8 字符不会被截断在两块之间，
+    可逐块独立解码。``partial`` 为 True 时不等待换行，读到即返回，只扣留末尾不完整的 UTF-8 字符，
+    适合 tail 这类需要立即显示进度条等无换行输出的场景。
+    """
+
+    # 直接在底层文件描述符上读取，绕过逐行 readline 的 Python 层开销。
+    fd = process.stdout.fileno()
+    # 保存尚未遇到换行符（或尚不完整的 UTF-8 字符）的残余片段，等待下一块数据补齐。
+    pending = b""
+    while True:
+        chunk = os.read(fd, _PIPE_CHUNK_SIZE)
+        # 读到空字节串表示子进程已关闭输出。
+        if not chunk:
+            break
+        data = pending + chunk
+        if partial:
+            # 只扣留末尾被截断的多字节字符，其余内容立即交给调用方。
+            cut = _utf8_complete_length(data)
+            complete, pending = data[:cut], data[cut:]
+            if complete:
+                yield complete
+            continue
+        # 以最后一个换行符为界，前半部分是完整行，后半部分留待下次拼接。
+        complete, newline, pending = data.rpartition(b"\n")
+        if newline:
+            yield complete + newline
+    # 输出结束后补齐最后一段不以换行结尾的内容。
+    if pending:
+        yield pending
+
+# 定义一个辅助函数，计算字节串中不含末尾残缺 UTF-8 字符的最长前缀长度。
+def _utf8_complete_length(data: bytes) -> int:
+    # 从末尾向前最多检查 4 个字节，找到最后一个字符的首字节。
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        # 延续字节（10xxxxxx）继续向前查找首字节。
+        if byte & 0xC0 == 0x80:
+            continue
+        # 单字节字符或非法首字节无需扣留。
+        if byte < 0xC0:
+            return len(data)
+        # 根据首字节判断该字符应有的总长度，不足时将其扣留。
+        expected = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+        return len(data) - back if back < expected else len(data)
+    return len(data)
+
+# 记录最近一次检测的标准输出对象及其是否为终端，避免每个块都调用 isatty。
+_console_tty_state: Tuple[object, bool] = (None, False)
+
+
+def _console_is_tty() -> bool:
+    """返回当前 sys.stdout 是否连接到终端，结果按输出对象缓存。"""
+
+    global _console_tty_state
+    stream = sys.stdout
+    if _console_tty_state[0] is not stream:
+        try:
+            is_tty = stream.isatty()
+        except (AttributeError, ValueError):
+            is_tty = False
+        _console_tty_state = (stream, is_tty)
+    return _console_tty_state[1]
+
+
+# 定义一个辅助函数，将原始字节块尽可能直接写入终端。
+def _write_console_bytes(chunk: bytes) -> None:
+    # 终端需要逐块（即按行）刷新保持实时反馈；重定向到文件或管道时交给缓冲区攒批写出。
+    line_flush = _console_is_tty()
+    # 终端本身使用 UTF-8 时直接写入底层缓冲区，省去一次解码与再编码。
+    buffer = getattr(sys.stdout, "buffer", None)
+    encoding = (getattr(sys.stdout, "encoding", "") or "").lower().replace("-", "")
+    if buffer is not None and encoding == "utf8":
+        # 文本层已在流开始时由 _begin_console_stream 冲刷过，这里只写底层缓冲区，
+        # 不再逐块调用 sys.stdout.flush()（它会连带刷新底层缓冲区，使非终端场景的攒批失效）。
+        buffer.write(chunk)
+        if line_flush:
+            buffer.flush()
+        return
+    # 其他编码（如 Windows 下的 gbk）仍需解码后交由文本层转换。
+    sys.stdout.write(chunk.decode("utf-8", errors="replace"))
+    if line_flush:
+        sys.stdout.flush()
+
+# 定义一个辅助函数，在一段流式输出开始前冲刷文本层，保证之前 print 的内容先于原始字节写出。
+def _begin_console_stream() -> None:
+    sys.stdout.flush()
+
+# 定义一个辅助函数，在一段流式输出结束后把尚未写出的内容全部刷新。
+def _flush_console() -> None:
+    sys.stdout.flush()
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is not None:
+        buffer.flush()
 
 # 定义一个辅助函数，用于在终端实时打印命令输出。
-def _stream_process(process: subprocess.Popen) -> str:
-    # 初始化一个列表用于收集输出行，稍后拼接成字符串返回。
-    collected_lines = []
-    # 持续读取子进程输出直到结束。
-    for line in iter(process.stdout.readline, ""):
-        # 将读取到的行立即打印到本地终端，保持实时反馈。
-        print(line, end="")
-        # 同时将该行保存到列表中，以便调用方进一步解析。
-        collected_lines.append(line)
+def _stream_process(process: subprocess.Popen, collect: bool = True,
+                    echo: bool = True, max_capture: Optional[int] = None) -> Optional[bytes]:
+    # 使用 bytearray 原地累积原始输出，避免为每个块创建新的字符串对象。
+    collected = bytearray() if collect else None
+    # 回显前冲刷一次文本层，之后逐块只写底层缓冲区。
+    if echo:
+        _begin_console_stream()
+    # 持续按块读取子进程输出直到结束。
+    for chunk in _iter_raw_chunks(process):
+        # 每个块只写入并刷新一次终端，保持实时反馈；并发执行时由调用方关闭回显。
+        if echo:
+            _write_console_bytes(chunk)
+        # 需要时将该块追加到缓冲区中，以便调用方进一步解析。
+        if collected is not None:
+            collected += chunk
+            # 仅需末尾内容时，超过两倍上限才裁剪一次，使裁剪开销均摊到多次追加上。
+            if max_capture and len(collected) > 2 * max_capture:
+                del collected[:-max_capture]
+    # 仅保留末尾 max_capture 字节。
+    if collected is not None and max_capture:
+        del collected[:-max_capture]
+    # 输出结束后刷新非终端场景下攒批的内容。
+    _flush_console()
     # 等待子进程结束并获取退出码。
     process.wait()
-    # 将所有行拼接成单个字符串返回。
-    return "".join(collected_lines)
+    # 返回原始字节，由调用方在需要时再解码。
+    return bytes(collected) if collected is not None else None
+
+# 定义一个辅助函数，将环境变量键值对格式化为经 shell 转义的赋值前缀，并缓存结果。
+@functools.lru_cache(maxsize=256)
+def _format_env(items: Tuple[Tuple[str, str], ...]) -> str:
+    return " ".join(f"{key}={shlex.quote(value)}" for key, value in items)
 
 # 定义运行远程命令的主函数，支持注入环境变量。
-def run_ssh_command(host: str, command: str, user: Optional[str] = None,
-                    keyfile: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+def run_ssh_command(host: str, command: Union[str, Sequence[str]], user: Optional[str] = None,
+                    keyfile: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                    collect_output: bool = True, echo: bool = True,
+                    max_capture: Optional[int] = None) -> subprocess.CompletedProcess:
     # 构建 ssh 基础命令参数。
-    args = list(_base_ssh_args(host, user, keyfile))
+    base_args = _base_ssh_args(host, user, keyfile)
+    # 若以 argv 序列形式传入命令，则在 ssh 边界处统一转义一次。
+    if not isinstance(command, str):
+        command = shlex.join(command)
     # 如果存在需要注入的环境变量，则在远端命令前增加键值对声明。
     if env:
-        # 使用列表推导确保所有值都转换为字符串并进行 shell 安全转义。
-        exports = [f"{key}={shlex.quote(str(value))}" for key, value in env.items() if value is not None]
+        # 将环境变量规整为可哈希的元组，相同的变量组合直接复用已转义的前缀。
+        exports = _format_env(tuple((key, str(value)) for key, value in env.items() if value is not None))
         # 将环境变量与实际命令拼接在一起。
-        remote_command = " ".join(exports + [command]) if exports else command
+        remote_command = f"{exports} {command}" if exports else command
     else:
         # 如果没有环境变量，则直接使用传入的命令。
         remote_command = command
-    # 将远端命令追加到 ssh 参数列表中。
-    args.append(remote_command)
-    # 启动子进程并开启文本模式，以便逐行读取输出。
-    # 强制以 UTF-8 解码远端输出，避免在 Windows 下因为默认编码 (如 gbk)
-    # 无法处理部分字符而导致 UnicodeDecodeError。
-    process = subprocess.Popen(
-        args,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-        bufsize=1,
-    )
-    # 通过辅助函数实时读取输出并收集。
-    stdout_data = _stream_process(process)
+    # 将远端命令追加到 ssh 参数之后。
+    args = (*base_args, remote_command)
+    # 持有主连接引用，确保命令执行期间连接不会被回收。
+    with ssh_pool.acquire(user, host, keyfile):
+        # 以二进制管道启动子进程，由 _iter_raw_chunks 按块读取原始字节，仅在边界处
+        # 统一以 UTF-8 解码，避免在 Windows 下因为默认编码 (如 gbk) 无法处理部分字符
+        # 而导致 UnicodeDecodeError。直接读取底层描述符，因此无需 Python 缓冲。
+        # 命令本身只是复用主连接上的一个新通道，close_fds=False 让启动走 posix_spawn。
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+            close_fds=False,
+        )
+        # 通过辅助函数实时读取输出，仅关心退出码的调用方可跳过收集。
+        stdout_bytes = _stream_process(process, collect=collect_output, echo=echo, max_capture=max_capture)
+    # 仅在调用方需要时才在边界处解码为字符串。
+    stdout_data = stdout_bytes.decode("utf-8", errors="replace") if stdout_bytes is not None else None
     # 构造 CompletedProcess 对象以封装执行结果。
     return subprocess.CompletedProcess(args=args, returncode=process.returncode, stdout=stdout_data, stderr=None)
 
+# 定义在多台主机上并发执行同一条命令的函数。
+def run_ssh_many(
+    targets: Sequence[Tuple[str, Optional[str], Optional[str]]],
+    command: Union[str, Sequence[str]],
+    env: Optional[Dict[str, str]] = None,
+) -> Dict[str, subprocess.CompletedProcess]:
+    """对 (host, user, keyfile) 列表并发执行命令，返回以主机地址为键的结果字典。"""
+
+    # 没有目标时直接返回空结果。
+    if not targets:
+        return {}
+    results: Dict[str, subprocess.CompletedProcess] = {}
+    # 线程主要阻塞在网络 I/O 上，并发数上限 32 以免触发远端 sshd 的 MaxStartups 限制。
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(32, len(targets)), thread_name_prefix="ssh-many"
+    ) as executor:
+        futures = {
+            executor.submit(
+                run_ssh_command, host, command, user=user, keyfile=keyfile, env=env, echo=False
+            ): host
+            for host, user, keyfile in targets
+        }
+        # 按完成顺序收集结果，输出不回显到终端以免多台主机的内容交错。
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
 # 定义一个辅助函数用于将本地文件上传到远端主机。
 def scp_upload(local_path: str, remote_path: str, host: str, user: Optional[str] = None,
-               keyfile: Optional[str] = None) -> None:
-    # 以 scp 为基础命令并启用 -p 参数保留文件时间戳。
-    args = [
-        "scp",
-        "-p",
-        "-o",
-        "BatchMode=yes",
-        "-o",
-        "StrictHostKeyChecking=no",
-        "-o",
-        "UserKnownHostsFile=/dev/null",
-    ]
+               keyfile: Optional[str] = None, quiet: bool = True) -> None:
+    # 以 scp 为基础命令并启用 -p 参数保留文件时间戳，连接选项与 ssh 保持一致以复用主连接。
+    args = ["scp", "-p", *_common_ssh_options(host, user, bulk=True, keyfile=keyfile)]
     # 如果提供了私钥路径，则加入 -i 选项。
     if keyfile:
         args.extend(["-i", keyfile])
@@ -489,8 +920,88 @@ def scp_upload(local_path: str, remote_path: str, host: str, user: Optional[str]
     remote_target = f"{_build_target(host, user)}:{remote_path}"
     # 将本地文件路径和远端路径依次加入参数列表。
     args.extend([local_path, remote_target])
-    # 执行 scp 命令并在失败时抛出异常。
-    subprocess.run(args, check=True)
+    # 持有大流量主连接引用，上传期间连接不会被回收。
+    with ssh_pool.acquire(user, host, keyfile, bulk=True):
+        # 静默模式下丢弃 scp 的进度输出，仅收集 stderr 以便失败时说明原因。
+        result = subprocess.run(
+            args,
+            stdout=subprocess.DEVNULL if quiet else None,
+            stderr=subprocess.PIPE if quiet else None,
+            close_fds=False,
+        )
+    # 上传失败时抛出异常，并附带解码后的 stderr 内容。
+    if result.returncode != 0:
+        stderr_text = (result.stderr or b"").decode("utf-8", errors="replace").strip()
+        raise subprocess.CalledProcessError(result.returncode, args, stderr=stderr_text)
+
+# 定义使用 rsync 上传单个文件的函数，远端已有同名文件时仅传输差异部分。
+def rsync_upload(local_path: str, remote_path: str, host: str, user: Optional[str] = None,
+                 keyfile: Optional[str] = None) -> None:
+    # 本地缺少 rsync 时无法使用增量传输，交由调用方改用 scp_upload。
+    detected_rsync = detect_local_rsync()
+    if not detected_rsync:
+        raise FileNotFoundError("本地未检测到 rsync")
+    # 复用大流量主连接作为 rsync 的传输通道。
+    ssh_transport = _ssh_transport(host, user, keyfile)
+    # --inplace 直接改写远端文件，--partial 保留中断时已传输的部分。
+    args = [
+        str(detected_rsync),
+        "-a",
+        "--inplace",
+        "--partial",
+        "-e",
+        ssh_transport,
+        local_path,
+        f"{_build_target(host, user)}:{remote_path}",
+    ]
+    # 持有大流量主连接引用，上传期间连接不会被回收。
+    with ssh_pool.acquire(user, host, keyfile, bulk=True):
+        # 丢弃进度输出，仅收集 stderr 以便失败时说明原因。
+        result = subprocess.run(
+            args, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, close_fds=False
+        )
+    # 上传失败（包括远端缺少 rsync）时抛出异常，并附带解码后的 stderr 内容。
+    if result.returncode != 0:
+        stderr_text = result.stderr.decode("utf-8", errors="replace").strip()
+        raise subprocess.CalledProcessError(result.returncode, args, stderr=stderr_text)
+
+# 定义批量上传多个文件的函数，在单个进程内完成全部传输。
+def scp_upload_many(local_paths: Sequence[str], remote_dir: str, host: str,
+                    user: Optional[str] = None, keyfile: Optional[str] = None) -> None:
+    # 没有需要上传的文件时直接返回。
+    if not local_paths:
+        return
+    # 远端目录统一以斜杠结尾，确保文件被放入目录内。
+    remote_target = f"{_build_target(host, user)}:{remote_dir.rstrip('/')}/"
+    # 优先使用 rsync，通过单条 SSH 流水线传输所有文件的元数据与内容。
+    detected_rsync = detect_local_rsync()
+    if detected_rsync:
+        ssh_transport = _ssh_transport(host, user, keyfile)
+        args = [str(detected_rsync), "-az", "-e", ssh_transport, *local_paths, remote_target]
+    else:
+        # 本地缺少 rsync 时退回到一次性传入多个源文件的 scp 调用。
+        args = ["scp", "-p", *_common_ssh_options(host, user, bulk=True, keyfile=keyfile)]
+        if keyfile:
+            args.extend(["-i", keyfile])
+        args.extend([*local_paths, remote_target])
+    # 持有大流量主连接引用，上传期间连接不会被回收。
+    with ssh_pool.acquire(user, host, keyfile, bulk=True):
+        # 执行上传命令并在失败时抛出异常。
+        subprocess.run(args, check=True)
+
+# 定义一个辅助函数，单次遍历环境变量并同时返回真实与脱敏两种赋值前缀。
+def _build_env_assignments(env_vars: Dict[str, str]) -> Tuple[str, str]:
+    real: List[str] = []
+    shown: List[str] = []
+    for key, value in env_vars.items():
+        # 忽略空值，不向远端注入空变量。
+        if not value:
+            continue
+        # 每个值只转义一次，非敏感变量的展示内容直接复用同一个赋值字符串。
+        assignment = f"{key}={shlex.quote(str(value))}"
+        real.append(assignment)
+        shown.append(f"{key}=***" if _SENSITIVE_KEY_RE.search(key) else assignment)
+    return " ".join(real), " ".join(shown)
 
 # 定义在远端 tmux 中启动后台任务的函数。
 def start_remote_job_in_tmux(
@@ -519,92 +1030,69 @@ def start_remote_job_in_tmux(
     if not project_dir:
         print("[remote_exec] ❌ 缺少项目目录，无法构建远端执行命令。")
         return 1
-    # 如果目标 tmux 会话已存在，则尝试提前停止，避免重复创建报错。
-    if has_tmux_session(user=user, host=host, session=session, keyfile=keyfile):
-        print(
-            f"[remote_exec] ℹ️ tmux 会话 {session} 已存在，正在尝试停止以便重新创建。"
-        )
-        stop_code = stop_tmux_session(
-            user=user, host=host, session=session, keyfile=keyfile
-        )
-        if stop_code != 0:
-            print(
-                f"[remote_exec] ❌ 无法停止已存在的 tmux 会话 {session}，终止启动流程。"
-            )
-            return stop_code
-    # 计算日志目录并在远端创建，避免 tee 写入失败。
-    log_dir = os.path.dirname(log_file)
-    if log_dir:
-        ensure_dir_cmd = f"bash -lc {shlex.quote(f'mkdir -p {shlex.quote(log_dir)}')}"
-        dir_result = run_ssh_command(host=host, user=user, keyfile=keyfile, command=ensure_dir_cmd)
-        if dir_result.returncode != 0:
-            print("[remote_exec] ❌ 无法在远端创建日志目录，请检查权限。")
-            return dir_result.returncode
-    # 构造需要注入的环境变量字典，忽略空值。
-    env_vars = {k: v for k, v in (env_vars or {}).items() if v}
-    # 构造实际使用的环境变量赋值字符串。
-    env_assignments = " ".join(f"{key}={shlex.quote(str(value))}" for key, value in env_vars.items())
-    # 构造用于展示的环境变量，敏感键名替换为 ***。
-    redacted_env = {}
-    for key, value in env_vars.items():
-        if any(token in key.lower() for token in ["token", "secret", "key"]):
-            redacted_env[key] = "***"
-        else:
-            redacted_env[key] = str(value)
-    # 组合注入环境变量后的真实命令，空值自动忽略。
-    command_with_env = f"{env_assignments} {cmd}".strip() if env_assignments else cmd
-    # 构造在日志中展示的命令，敏感变量已替换。
-    redacted_assignments = " ".join(
-        f"{key}={shlex.quote(value)}" for key, value in redacted_env.items()
-    )
-    # 将敏感信息替换后的命令用于本地提示。
-    redacted_command = (
-        f"{redacted_assignments} {cmd}".strip() if redacted_assignments else cmd
-    )
-    # 为日志记录准备一份转义后的命令文本，避免双引号导致语法错误。
-    escaped_for_log = command_with_env.replace("\"", r"\\\"")
+    # 一次性生成真实赋值前缀与敏感值替换为 *** 的展示前缀。
+    env_prefix, redacted_prefix = _build_env_assignments(env_vars or {})
+    # 组合注入环境变量后的真实命令与用于本地提示的展示命令。
+    command_with_env = f"{env_prefix} {cmd}" if env_prefix else cmd
+    redacted_command = f"{redacted_prefix} {cmd}" if redacted_prefix else cmd
     # 对远端日志路径进行 shell 转义，避免空格导致失败。
     quoted_log_file = shlex.quote(log_file)
     # 对项目目录进行转义，确保 cd 指令安全。
     quoted_project_dir = shlex.quote(project_dir)
-    # 构造记录开始时间与命令的 echo 语句。
-    start_line = (
-        f'echo "[START] $(date -Is) session={session} cmd={escaped_for_log}" | '
-        f"tee -a {quoted_log_file}"
-    )
-    # 构造执行主体，将 stdout/stderr 合并并通过 tee 追加到日志。
-    pipeline = (
-        f"{command_with_env} 2>&1 | tee -a {quoted_log_file}"
-    )
+    # 构造记录开始时间与命令的 echo 语句，会话名与命令文本取自位置参数 $1、$2，无需再手工转义。
+    start_line = f'echo "[START] $(date -Is) session=$1 cmd=$2" | tee -a {quoted_log_file}'
     # 构造结束语句，记录退出码并同样写入日志。
     end_line = (
         f'echo "[END] $(date -Is) exit_code=${{exit_code}}" | tee -a {quoted_log_file}'
     )
-    # 组合完整的 bash 片段，确保在项目目录下运行并维护退出码。
-    bash_body = (
-        f"cd {quoted_project_dir} && {{ {start_line}; {pipeline}; "
+
+    # 命令前后的固定片段只构造一次，真实命令与展示命令共用。
+    body_prefix = f"cd {quoted_project_dir} && {{ {start_line}; "
+    body_suffix = (
+        f" 2>&1 | tee -a {quoted_log_file}; "
         f"exit_code=${{PIPESTATUS[0]}}; {end_line}; exit $exit_code; }}"
     )
-    # 使用 bash -lc 执行组合后的脚本片段。
-    bash_command = f"bash -lc {shlex.quote(bash_body)}"
-    # 将命令封装为 tmux new-session 的参数，后台启动会话。
-    tmux_command = f"tmux new-session -d -s {shlex.quote(session)} {shlex.quote(bash_command)}"
+
+    # 定义内部函数，根据给定命令文本组合在 tmux 中运行的 argv。
+    def _compose_job_argv(command_text: str) -> Sequence[str]:
+        # 执行主体将 stdout/stderr 合并并通过 tee 追加到日志，确保在项目目录下运行并维护退出码。
+        bash_body = body_prefix + command_text + body_suffix
+        # 以 argv 形式传递脚本及其位置参数。
+        return ["bash", "-lc", bash_body, "vultragent-job", session, command_text]
+
+    # tmux 会话内的命令只在此处做一次 shell 转义。
+    bash_command = shlex.join(_compose_job_argv(command_with_env))
     # 构造敏感信息已替换的展示命令，便于用户排查问题。
-    redacted_pipeline = f"{redacted_command} 2>&1 | tee -a {log_file}"
-    redacted_body = (
-        f"cd {project_dir} && {{ echo \"[START] $(date -Is) session={session} cmd={redacted_command}\" | "
-        f"tee -a {log_file}; {redacted_pipeline}; exit_code=${{PIPESTATUS[0]}}; "
-        f"echo \"[END] $(date -Is) exit_code=${{exit_code}}\" | tee -a {log_file}; exit $exit_code; }}"
-    )
-    redacted_display = (
-        f"tmux new-session -d -s {session} \"bash -lc {shlex.quote(redacted_body)}\""
+    redacted_display = shlex.join(
+        ["tmux", "new-session", "-d", "-s", session, shlex.join(_compose_job_argv(redacted_command))]
     )
     # 打印最终命令，便于用户复制执行。
     print(f"[remote_exec] ▶ {redacted_display}")
-    # 调用 run_ssh_command 在远端执行 tmux 命令。
-    result = run_ssh_command(host=host, user=user, keyfile=keyfile, command=tmux_command)
+    # 通过一次 SSH 调用完成旧会话清理、日志目录创建与新会话启动。
+    result = run_ssh_command(
+        host=host,
+        user=user,
+        keyfile=keyfile,
+        command=["bash", "-lc", _TMUX_LAUNCH_SCRIPT],
+        env={
+            "VULTRAGENT_TMUX_SESSION": session,
+            "VULTRAGENT_LOG_DIR": os.path.dirname(log_file),
+            "VULTRAGENT_TMUX_COMMAND": bash_command,
+        },
+    )
+    # 脚本末尾已用 has-session 确认会话状态，直接写入探测缓存，调用方随后的检测无需再次往返。
+    _TMUX_PROBE_CACHE[(user, host, session)] = (time.monotonic(), result.returncode == 0)
+    # 根据远端脚本输出的标记判断各个分支的执行情况。
+    launch_output = result.stdout or ""
+    if "VULTRAGENT_TMUX_REPLACED=1" in launch_output:
+        print(f"[remote_exec] ℹ️ tmux 会话 {session} 已存在，已停止并重新创建。")
+    if "VULTRAGENT_LOG_DIR_FAILED=1" in launch_output:
+        print("[remote_exec] ❌ 无法在远端创建日志目录，请检查权限。")
+        return result.returncode
     # 根据返回码判断是否成功创建 tmux 会话。
     if result.returncode == 0:
+        # 记录刚启动任务的日志，后续镜像时可跳过初次全量同步。
+        _FRESH_REMOTE_LOGS.add((user, host, log_file))
         print(f"[remote_exec] ✅ 已创建 tmux 会话 {session}，日志写入 {log_file}。")
     else:
         print(f"[remote_exec] ❌ tmux 会话创建失败，返回码 {result.returncode}。")
@@ -626,36 +1114,53 @@ def tail_remote_log(
     if not user:
         print("[remote_exec] ❌ 缺少 SSH 用户名，无法连接远端主机。")
         return 1
-    # 构造 ssh 命令参数，并追加 tail 命令。
-    args = list(_base_ssh_args(host, user, keyfile))
-    args.append(f"tail -n +1 -f {shlex.quote(log_path)}")
-    # 提示用户如何退出日志追踪。
-    print(f"[remote_exec] ▶ tail -f {log_path}（按 Ctrl+C 结束）")
-    # 启动子进程并实时转发输出。
-    # tail 同样指定 UTF-8 编码，保持与 run_ssh_command 的输出行为一致。
-    process = subprocess.Popen(
-        args,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-        bufsize=1,
+    # 构造 ssh 命令参数，并追加 tail 命令：仅查看时只回放末尾若干行，无需每次从头传输整份日志；
+    # 使用 -F 按文件名跟踪，日志被轮转后会自动切换到新文件。
+    args = (
+        *_base_ssh_args(host, user, keyfile, bulk=True),
+        f"tail -n {_TAIL_VIEW_LINES} -F {shlex.quote(log_path)}",
     )
-    try:
-        for line in iter(process.stdout.readline, ""):
-            print(line, end="")
-    except KeyboardInterrupt:
-        # 捕获用户中断并通知远端停止 tail。
-        print("\n[remote_exec] ⏹ 停止日志追踪，正在发送中断信号……")
-        process.send_signal(signal.SIGINT)
-    finally:
-        # 等待子进程退出以获取退出码。
-        process.wait()
+    # 提示用户如何退出日志追踪。
+    print(f"[remote_exec] ▶ tail -F {log_path}（按 Ctrl+C 结束）")
+    # 持有大流量主连接引用，长时间 tail 期间连接不会被回收。
+    with ssh_pool.acquire(user, host, keyfile, bulk=True):
+        # 启动子进程并实时转发输出。
+        # tail 同样按块读取原始字节并直接写入终端，保持与 run_ssh_command 的输出行为一致。
+        # Python 默认创建的文件描述符均不可继承，close_fds=False 不会泄漏额外句柄，却能让启动走 posix_spawn。
+        process = subprocess.Popen(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+            close_fds=False,
+        )
+        try:
+            # 冲刷此前的提示文本，之后逐块只写底层缓冲区。
+            _begin_console_stream()
+            # 不等待换行立即转发，进度条等以 \r 刷新的输出也能实时显示。
+            for chunk in _iter_raw_chunks(process, partial=True):
+                _write_console_bytes(chunk)
+        except KeyboardInterrupt:
+            # 捕获用户中断并通知远端停止 tail。
+            print("\n[remote_exec] ⏹ 停止日志追踪，正在发送中断信号……")
+            process.send_signal(signal.SIGINT)
+        finally:
+            # 刷新攒批的输出并等待子进程退出以获取退出码。
+            _flush_console()
+            process.wait()
     # 返回子进程退出码，130 表示被 Ctrl+C 中断。
     return process.returncode
 
 
+# 定义一个辅助函数，读取状态文件中的实例标签与 ID，并按修改时间缓存结果。
+@functools.lru_cache(maxsize=4)
+def _load_state_identity(state_path: str, mtime_ns: int) -> Tuple[str, str]:
+    # mtime_ns 仅参与缓存键计算，文件被改写后会自动重新解析。
+    # 直接把原始字节交给 json.loads，省去文本层的解码包装。
+    state_data = json.loads(Path(state_path).read_bytes())
+    # 仅提取日志目录命名所需的两个字段。
+    return state_data.get("label", "") or "", state_data.get("instance_id", "") or ""
+
 # 定义实时追踪并镜像远端日志的函数。
 def tail_and_mirror_log(
     user: str,
@@ -665,7 +1170,11 @@ def tail_and_mirror_log(
     local_filename: str = "run.log",
     keyfile: Optional[str] = None,
     mirror_interval_sec: int = 3,
+    remote_is_fresh: bool = False,
 ) -> int:
+    # tail -F 已实时写入本地副本，不再周期性执行 rsync；
+    # mirror_interval_sec 仅为兼容既有调用与配置而保留。
+    del mirror_interval_sec
     # 校验必需的连接参数，缺失时直接返回错误码。
     if not host or not remote_log:
         print("[remote_exec] ❌ 缺少 host 或 remote_log，无法执行日志镜像。")
@@ -675,23 +1184,21 @@ def tail_and_mirror_log(
         print("[remote_exec] ❌ 缺少 SSH 用户名，无法连接远端主机。")
         return 1
     # 解析状态文件以确定实例标签或 ID。
-    state_path = Path(__file__).resolve().parent.parent / ".state.json"
+    state_path = _STATE_PATH
     instance_label = ""
     instance_id = ""
-    if state_path.exists():
-        try:
-            with state_path.open("r", encoding="utf-8") as handle:
-                state_data = json.load(handle)
-            instance_label = state_data.get("label", "") or ""
-            instance_id = state_data.get("instance_id", "") or ""
-        except json.JSONDecodeError:
-            print("[remote_exec] ⚠️ .state.json 无法解析，将使用主机地址作为日志目录。")
-    else:
+    try:
+        # 以修改时间作为缓存键的一部分，文件未变化时直接复用上一次的解析结果。
+        state_mtime_ns = state_path.stat().st_mtime_ns
+        instance_label, instance_id = _load_state_identity(str(state_path), state_mtime_ns)
+    except FileNotFoundError:
         print("[remote_exec] ⚠️ 未找到 .state.json，将使用主机地址作为日志目录。")
+    except json.JSONDecodeError:
+        print("[remote_exec] ⚠️ .state.json 无法解析，将使用主机地址作为日志目录。")
     # 计算用于存放本地日志的目录名称，优先使用实例标签，其次 ID，最后使用主机名。
     base_name = instance_label or instance_id or host.replace(".", "-")
     # 生成时间戳目录，采用本地时间以方便对应操作时间。
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    timestamp = _format_ts_s("-")
     # 构建最终的本地日志目录路径。
     local_root_path = Path(local_log_dir).expanduser()
     session_dir = local_root_path / base_name / timestamp
@@ -714,21 +1221,25 @@ def tail_and_mirror_log(
         else:
             print("[remote_exec] ℹ️ 请通过包管理器安装 rsync，例如 sudo apt install -y rsync。")
     # 预构建 ssh 基础参数，供后续 rsync 与 tail 复用。
-    ssh_base_args = list(_base_ssh_args(host, user, keyfile))
+    ssh_base_args = _base_ssh_args(host, user, keyfile)
+    # 日志 tail 与 rsync 镜像属于大流量通道，使用开启压缩的独立主连接。
+    ssh_bulk_args = _base_ssh_args(host, user, keyfile, bulk=True)
 
-    # 在存在本地 rsync 的前提下，优先确认远端同样具备 rsync 能力。
-    if rsync_available and not _remote_command_available(ssh_base_args, "rsync"):
-        print("[remote_exec] ⚠️ 远端未检测到 rsync，日志镜像将降级为仅使用 tail 输出。")
-        print(
-            "[remote_exec] ℹ️ 请在远端安装 rsync（例如执行 sudo apt install -y rsync）后重试。"
-        )
-        rsync_available = False
+    # 在存在本地 rsync 的前提下，优先确认远端同样具备 rsync 能力；近期已确认过则跳过探测。
+    if rsync_available and not _remote_rsync_known(user, host, keyfile):
+        if _remote_command_available(ssh_base_args, "rsync"):
+            _remember_remote_rsync(user, host, keyfile, "rsync")
+        else:
+            print("[remote_exec] ⚠️ 远端未检测到 rsync，日志镜像将降级为仅使用 tail 输出。")
+            print(
+                "[remote_exec] ℹ️ 请在远端安装 rsync（例如执行 sudo apt install -y rsync）后重试。"
+            )
+            rsync_available = False
 
     # 构建远端目标字符串，使用 shlex.quote 确保路径安全。
     remote_target = f"{user}@{host}:{shlex.quote(remote_log)}"
-    # 基于 ssh_base_args 生成 -e 参数所需的 ssh 传输配置。
-    ssh_transport_parts = ssh_base_args[:-1]
-    ssh_transport = " ".join(shlex.quote(part) for part in ssh_transport_parts)
+    # 取得 -e 参数所需的 ssh 传输配置，与 ssh_bulk_args 共用同一组缓存参数。
+    ssh_transport = _ssh_transport(host, user, keyfile)
     if rsync_available and not ssh_transport:
         print("[remote_exec] ⚠️ 无法构建 rsync 所需的 ssh 参数，已降级为仅使用 tail 输出。")
         rsync_available = False
@@ -771,67 +1282,89 @@ def tail_and_mirror_log(
             print("[remote_exec] ⚠️ 未找到 rsync 命令，已降级为仅 tail 模式。")
             rsync_available = False
             return 1
-    # 在进入实时查看之前执行一次全量 rsync，保证本地拥有最新快照。
-    if rsync_available:
+    # 本进程刚启动的任务日志同样视为新文件，只需消费一次该标记。
+    if (user, host, remote_log) in _FRESH_REMOTE_LOGS:
+        _FRESH_REMOTE_LOGS.discard((user, host, remote_log))
+        remote_is_fresh = True
+    # 默认从第一行开始 tail，由 tail 负责把完整日志写入本地副本。
+    tail_start = "-n +1"
+    # 在进入实时查看之前执行一次全量 rsync，保证本地拥有最新快照；
+    # 新日志几乎为空且 tail -n +1 会从头回放，此时跳过以省去一次 rsync 握手。
+    if rsync_available and not remote_is_fresh:
         print("[remote_exec] 🔄 正在执行初次 rsync，同步远端日志。")
         initial_code = _run_rsync(show_warnings=True, suppress_output=False)
         if initial_code != 0:
             print("[remote_exec] ⚠️ 初次 rsync 失败，将继续通过 tail 获取实时输出。")
-    # 创建用于停止后台线程的事件对象。
-    stop_event = threading.Event()
-    # 定义后台线程逻辑，周期性地触发 rsync 增量同步。
-    def _mirror_worker() -> None:
-        # 持续运行直到主线程发出停止信号。
-        while not stop_event.is_set():
-            # 等待指定的时间间隔，期间若收到停止信号则提前退出。
-            interval = mirror_interval_sec if mirror_interval_sec > 0 else 3
-            if stop_event.wait(timeout=interval):
-                break
-            # 执行 rsync 并忽略非零退出码，仅在需要时输出警告。
-            _run_rsync(show_warnings=True, suppress_output=True)
-    # 当 rsync 可用时启动后台镜像线程。
-    mirror_thread: Optional[threading.Thread] = None
-    if rsync_available:
-        mirror_thread = threading.Thread(target=_mirror_worker, name="log-mirror", daemon=True)
-        mirror_thread.start()
+        else:
+            # 快照成功后从已同步字节之后开始 tail，避免整份日志再次传输并被重复追加到本地副本。
+            try:
+                synced_size = local_log_path.stat().st_size
+            except OSError:
+                synced_size = 0
+            tail_start = f"-c +{synced_size + 1}"
     # 构建 tail -F 命令以实时跟踪远端日志。
-    tail_args = list(ssh_base_args)
-    tail_args.append(f"tail -n +1 -F {shlex.quote(remote_log)}")
+    tail_args = (*ssh_bulk_args, f"tail {tail_start} -F {shlex.quote(remote_log)}")
     # 打印提示，告知用户如何退出实时查看。
     print(f"[remote_exec] ▶ tail -F {remote_log}（按 Ctrl+C 结束）")
     # 预先声明子进程变量，便于在上下文外部访问退出码。
     process: Optional[subprocess.Popen] = None
-    # 以追加模式打开本地日志文件，确保实时输出同步写入。
-    with local_log_path.open("a", encoding="utf-8", errors="replace") as local_handle:
-        # 启动 ssh 子进程，并将 stdout 合并 stderr。
-        process = subprocess.Popen(
-            tail_args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            bufsize=1,
-        )
-        try:
-            # 逐行读取远端输出，既打印到控制台也写入本地文件。
-            for line in iter(process.stdout.readline, ""):
-                print(line, end="")
-                local_handle.write(line)
-                local_handle.flush()
-        except KeyboardInterrupt:
-            # 当用户按下 Ctrl+C 时提示并向远端 tail 发送中断信号。
-            print("\n[remote_exec] ⏹ 捕获到中断信号，正在停止 tail 会话……")
-            interrupt_signal = getattr(signal, "SIGINT", signal.SIGTERM)
-            process.send_signal(interrupt_signal)
-        finally:
-            # 等待子进程退出以获取最终退出码。
-            process.wait()
-            # 通知后台镜像线程可以停止运行。
-            stop_event.set()
-    # 等待镜像线程结束，确保最后一次同步完成。
-    if mirror_thread is not None:
-        mirror_thread.join()
+    # 创建本地落盘队列，读取 tail 输出的主循环不会因磁盘写入而阻塞。
+    disk_queue: "queue.SimpleQueue[Optional[bytes]]" = queue.SimpleQueue()
+    # 定义落盘线程逻辑，以带 64 KiB 缓冲的二进制模式追加写入，并按时间窗口批量刷新。
+    def _disk_writer() -> None:
+        with io.BufferedWriter(io.FileIO(str(local_log_path), "a"), buffer_size=_PIPE_CHUNK_SIZE) as local_handle:
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    # 空闲时最多等待一个刷新周期，保证缓冲内容不会滞留过久。
+                    chunk = disk_queue.get(timeout=_LOCAL_FLUSH_INTERVAL_SEC)
+                except queue.Empty:
+                    chunk = b""
+                # 收到 None 表示 tail 已结束，退出线程时由 with 语句完成最终刷新。
+                if chunk is None:
+                    break
+                if chunk:
+                    local_handle.write(chunk)
+                # 距离上次刷新超过 200ms 才调用 flush，避免逐块触发系统调用。
+                now = time.monotonic()
+                if now - last_flush >= _LOCAL_FLUSH_INTERVAL_SEC:
+                    local_handle.flush()
+                    last_flush = now
+    # 落盘任务提交到模块级线程池，复用已有线程而无需每次创建新线程。
+    writer_future = _MIRROR_POOL.submit(_disk_writer)
+    try:
+        # 持有大流量主连接引用，长时间 tail 期间连接不会被回收。
+        with ssh_pool.acquire(user, host, keyfile, bulk=True):
+            # 启动 ssh 子进程，并将 stdout 合并 stderr。
+            # 与 tail_remote_log 相同，close_fds=False 让启动走 posix_spawn 而不是 fork。
+            process = subprocess.Popen(
+                tail_args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0,
+                close_fds=False,
+            )
+            try:
+                # 冲刷此前的提示文本，之后逐块只写底层缓冲区。
+                _begin_console_stream()
+                # 按块读取远端原始字节，直接写入终端并交给落盘线程，无需编解码。
+                for chunk in _iter_raw_chunks(process, partial=True):
+                    _write_console_bytes(chunk)
+                    disk_queue.put(chunk)
+            except KeyboardInterrupt:
+                # 当用户按下 Ctrl+C 时提示并向远端 tail 发送中断信号。
+                print("\n[remote_exec] ⏹ 捕获到中断信号，正在停止 tail 会话……")
+                interrupt_signal = getattr(signal, "SIGINT", signal.SIGTERM)
+                process.send_signal(interrupt_signal)
+            finally:
+                # 刷新攒批的输出并等待子进程退出以获取最终退出码。
+                _flush_console()
+                process.wait()
+    finally:
+        # 无论 tail 是否正常启动都通知落盘任务退出，避免线程池中的线程一直等待。
+        disk_queue.put(None)
+        # 等待落盘任务把队列中的内容全部写入本地文件，并暴露写入过程中的异常。
+        writer_future.result()
     # 在退出界面前执行最后一次 rsync，确保遗漏的内容被补齐。
     if rsync_available:
         print("[remote_exec] 🔁 正在进行最终 rsync，确保日志完整。")
@@ -851,6 +1384,7 @@ def stop_tmux_session(
     host: str,
     session: str,
     keyfile: Optional[str] = None,
+    missing_ok: bool = False,
 ) -> int:
     # 检查必要参数，缺失时直接返回失败。
     if not host or not session:
@@ -860,17 +1394,46 @@ def stop_tmux_session(
     if not user:
         print("[remote_exec] ❌ 缺少 SSH 用户名，无法连接远端主机。")
         return 1
+    # 调用 run_ssh_command 执行停止操作，只关心退出码。
+    result = run_ssh_command(
+        host=host,
+        user=user,
+        keyfile=keyfile,
+        command=_tmux_stop_command(session, missing_ok),
+        collect_output=False,
+    )
+    # 统一处理缓存失效与结果提示。
+    return _report_tmux_stop(user, host, session, result.returncode, missing_ok)
+
+
+# 定义一个辅助函数，构造停止 tmux 会话的远端命令，供单独调用与批量清理脚本共用。
+def _tmux_stop_command(session: str, missing_ok: bool = False) -> str:
     # 构造 tmux kill-session 命令。
     command = f"tmux kill-session -t {shlex.quote(session)}"
-    # 调用 run_ssh_command 执行停止操作。
-    result = run_ssh_command(host=host, user=user, keyfile=keyfile, command=command)
+    # 允许会话不存在时，在同一次 SSH 调用中先检测会话，不存在则以约定的退出码返回。
+    if missing_ok:
+        command = (
+            f"tmux has-session -t {shlex.quote(session)} 2>/dev/null "
+            f"|| exit {_TMUX_SESSION_MISSING_CODE}; {command}"
+        )
+    return command
+
+
+# 定义一个辅助函数，根据停止命令的退出码刷新探测缓存并输出提示，返回归一化后的退出码。
+def _report_tmux_stop(user: str, host: str, session: str, returncode: int, missing_ok: bool = False) -> int:
+    # 会话状态已改变，丢弃对应的探测缓存。
+    _TMUX_PROBE_CACHE.pop((user, host, session), None)
+    # 会话本就不存在时视为成功，与单独检测时的提示保持一致。
+    if missing_ok and returncode == _TMUX_SESSION_MISSING_CODE:
+        print(f"[remote_exec] ℹ️ 未检测到 tmux 会话 {session}。")
+        return 0
     # 根据返回码输出友好的提示信息。
-    if result.returncode == 0:
+    if returncode == 0:
         print(f"[remote_exec] ✅ tmux 会话 {session} 已停止。")
     else:
         print(f"[remote_exec] ⚠️ 无法停止 tmux 会话 {session}，可能不存在。")
     # 返回命令退出码供调用方处理。
-    return result.returncode
+    return returncode
 
 
 # 定义一个函数用于检测远端 tmux 会话是否存在。
@@ -884,12 +1447,22 @@ def has_tmux_session(
     if not host or not session or not user:
         print("[remote_exec] ⚠️ 缺少 host/user/session，无法检测 tmux 会话。")
         return False
-    # 构造 tmux has-session 命令以检测会话存在性。
-    command = f"tmux has-session -t {shlex.quote(session)}"
-    # 执行命令并获取返回码。
-    result = run_ssh_command(host=host, user=user, keyfile=keyfile, command=command)
-    # 根据返回码判断会话是否存在。
-    exists = result.returncode == 0
+    # 在缓存有效期内直接复用上一次的探测结果，省去一次 SSH 往返。
+    cache_key = (user, host, session)
+    use_cache = os.environ.get(_DISABLE_PROBE_CACHE_ENV, "") != "1"
+    cached = _TMUX_PROBE_CACHE.get(cache_key) if use_cache else None
+    if cached and time.monotonic() - cached[0] < _TMUX_PROBE_TTL_SEC:
+        exists = cached[1]
+    else:
+        # 构造 tmux has-session 命令以检测会话存在性。
+        command = f"tmux has-session -t {shlex.quote(session)}"
+        # 执行命令并获取返回码，无需收集输出。
+        result = run_ssh_command(host=host, user=user, keyfile=keyfile, command=command, collect_output=False)
+        # 根据返回码判断会话是否存在。
+        exists = result.returncode == 0
+        # 记录本次探测结果及时间戳。
+        if use_cache:
+            _TMUX_PROBE_CACHE[cache_key] = (time.monotonic(), exists)
     # 输出调试信息帮助用户了解状态。
     if exists:
         print(f"[remote_exec] ✅ 检测到 tmux 会话 {session} 正在运行。")
@@ -0,0 +1,204 @@
+# core/ssh_pool.py
+# 该模块维护 ssh 复用主连接的登记表，协调多个线程共享同一控制套接字。
+
+# 导入 atexit 模块用于在进程退出时关闭登记过的主连接。
+import atexit
+# 导入 contextlib 模块用于实现 acquire 上下文管理器。
+import contextlib
+# 导入 functools 模块用于缓存控制套接字路径的计算结果。
+import functools
+# 导入 hashlib 模块用于为控制套接字生成较短的文件名。
+import hashlib
+# 导入 os 模块用于判断平台与检查套接字是否存在。
+import os
+# 导入 subprocess 模块用于预建立主连接并向其发送控制指令。
+import subprocess
+# 导入 threading 模块用于保护登记表并运行回收线程。
+import threading
+# 导入 time 模块用于记录连接的最近使用时间。
+import time
+# 导入 pathlib.Path 以便跨平台构建路径。
+from pathlib import Path
+# 导入 typing 模块中的 Dict、Iterator、Optional、Tuple 类型用于类型注解。
+from typing import Dict, Iterator, Optional, Tuple
+
+# 定义 ssh 复用主连接的控制套接字目录，放在用户主目录下以避免超出 UNIX 套接字路径长度限制。
+MUX_DIR = Path.home() / ".ssh" / "vultragent-mux"
+# 在导入时创建控制套接字目录（仅当前用户可访问），避免每次构建 ssh 参数时重复 mkdir。
+_MUX_DIR_READY = False
+if os.name != "nt":
+    try:
+        MUX_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _MUX_DIR_READY = True
+    except OSError:
+        # 无法创建目录时退回到不复用连接的模式。
+        _MUX_DIR_READY = False
+# 定义主连接空闲多久后由回收线程关闭（秒）。
+_IDLE_TIMEOUT_SEC = 300
+# 定义回收线程的巡检间隔（秒）。
+_REAP_INTERVAL_SEC = 30
+
+# 登记表：控制套接字路径 -> {target, refs, last_used}。
+_registry: Dict[str, Dict[str, object]] = {}
+# 保护登记表本身的全局锁。
+_registry_lock = threading.Lock()
+# 回收线程实例，首次登记主连接时惰性启动。
+_reaper: Optional[threading.Thread] = None
+
+
+def mux_supported() -> bool:
+    """Windows 自带的 OpenSSH 不支持 ControlMaster，且套接字目录可用时才启用复用。"""
+
+    return _MUX_DIR_READY
+
+
+@functools.lru_cache(maxsize=256)
+def control_path(target: str, bulk: bool = False, keyfile: Optional[str] = None) -> str:
+    """返回 (user@host, keyfile) 对应的控制套接字路径，大流量通道使用独立的套接字。
+
+    复用连接的 ssh/scp/rsync 命令均不指定 -p，始终连接默认端口（或 ~/.ssh/config 中为该主机配置的端口），
+    因此路径无需区分端口。
+    """
+
+    # 对目标与私钥取短摘要作为文件名：不同进程对同一组合得到相同路径从而共享主连接，
+    # 使用不同私钥时则不会误用他人认证的连接；同时保证路径远低于 sun_path 的 104 字符上限。
+    digest = hashlib.sha1(f"{target}:{keyfile or ''}".encode("utf-8")).hexdigest()[:12]
+    # 压缩与加密算法在主连接建立时即已确定，大流量通道因此使用独立的主连接。
+    suffix = "-bulk" if bulk else ""
+    return str(MUX_DIR / f"cm-{digest}{suffix}")
+
+
+def master_active(target: str, bulk: bool = False, keyfile: Optional[str] = None) -> bool:
+    """判断目标的主连接是否已经建立。"""
+
+    return mux_supported() and os.path.exists(control_path(target, bulk, keyfile=keyfile))
+
+
+def _send_control(path: str, target: str, action: str) -> None:
+    # 延迟导入以避免与 remote_exec 之间的循环依赖。
+    from core.remote_exec import _ssh_executable
+
+    # 通过 -O 向主连接发送控制指令，输出全部丢弃；使用绝对路径并保留文件描述符，使启动走 posix_spawn。
+    subprocess.run(
+        [_ssh_executable(), "-o", f"ControlPath={path}", "-O", action, target],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        close_fds=False,
+    )
+
+
+def close_master(target: str, bulk: bool = False, keyfile: Optional[str] = None) -> None:
+    """立即关闭指定目标的主连接并将其移出登记表。"""
+
+    path = control_path(target, bulk, keyfile=keyfile)
+    with _registry_lock:
+        _registry.pop(path, None)
+    if mux_supported() and os.path.exists(path):
+        _send_control(path, target, "exit")
+
+
+def close_all() -> None:
+    """关闭本进程登记过的全部主连接，在进程退出时自动调用。"""
+
+    with _registry_lock:
+        entries = list(_registry.items())
+        _registry.clear()
+    for path, entry in entries:
+        if os.path.exists(path):
+            _send_control(path, str(entry["target"]), "exit")
+
+
+atexit.register(close_all)
+
+
+def _ensure_reaper() -> None:
+    # 回收线程只需启动一次，调用方已持有登记表锁。
+    global _reaper
+    if _reaper is None or not _reaper.is_alive():
+        _reaper = threading.Thread(target=_reap_idle_masters, name="ssh-mux-reaper", daemon=True)
+        _reaper.start()
+
+
+def _reap_idle_masters() -> None:
+    # 周期性巡检登记表，停止无人引用且空闲超时的主连接。
+    while True:
+        time.sleep(_REAP_INTERVAL_SEC)
+        now = time.monotonic()
+        with _registry_lock:
+            idle = [
+                (path, entry)
+                for path, entry in _registry.items()
+                if entry["refs"] == 0 and now - entry["last_used"] >= _IDLE_TIMEOUT_SEC
+            ]
+            for path, _ in idle:
+                _registry.pop(path, None)
+        for path, entry in idle:
+            # 使用 -O stop 让主连接不再接受新会话，已有会话（如未登记的 rsync）可以正常结束。
+            _send_control(path, str(entry["target"]), "stop")
+
+
+def _register(user: Optional[str], host: str, keyfile: Optional[str], bulk: bool,
+              refs: int) -> Tuple[str, Dict[str, object]]:
+    # 延迟导入以避免与 remote_exec 之间的循环依赖。
+    from core.remote_exec import _build_target
+
+    target = _build_target(host, user)
+    path = control_path(target, bulk, keyfile=keyfile)
+    # 登记与引用计数在同一次加锁内完成，回收线程或 close_master 无法在两者之间移除登记项。
+    with _registry_lock:
+        entry = _registry.setdefault(path, {"target": target, "refs": 0, "last_used": time.monotonic()})
+        entry["refs"] += refs
+        entry["last_used"] = time.monotonic()
+        _ensure_reaper()
+    return path, entry
+
+
+def warm_master(user: Optional[str], host: str, keyfile: Optional[str] = None,
+                bulk: bool = False) -> bool:
+    """在多个进程即将同时连接同一目标前预先建立主连接，返回主连接是否可用。
+
+    仅供并发场景使用：各进程同时以 ControlMaster=auto 启动时只有一个能绑定套接字，
+    其余会各自完成握手；普通调用无需预建立，第一条命令自身即成为主连接。
+    调用方应在 ``acquire`` 的上下文内调用，使主连接登记在册并在退出时被关闭。
+    """
+
+    if not mux_supported():
+        return False
+    # 延迟导入以避免与 remote_exec 之间的循环依赖。
+    from core.remote_exec import _base_ssh_args, _build_target
+
+    target = _build_target(host, user)
+    path = control_path(target, bulk, keyfile=keyfile)
+    if os.path.exists(path):
+        return True
+    # 执行一条空命令，由 ControlMaster=auto 建立并通过 ControlPersist 保持主连接。
+    result = subprocess.run(
+        (*_base_ssh_args(host, user, keyfile, bulk)[:-1], "-o", "ConnectTimeout=10", target, "true"),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0 and os.path.exists(path)
+
+
+@contextlib.contextmanager
+def acquire(user: Optional[str], host: str, keyfile: Optional[str] = None,
+            bulk: bool = False) -> Iterator[Optional[str]]:
+    """在上下文期间持有主连接的引用，防止其被回收线程关闭。
+
+    不会预先建立连接：第一条带 ControlMaster=auto 的命令自身即成为主连接，
+    主机不可达时调用方只需等待一次连接超时。
+    """
+
+    if not mux_supported():
+        yield None
+        return
+    path, entry = _register(user, host, keyfile, bulk, 1)
+    try:
+        yield path
+    finally:
+        # 直接操作登记时取得的条目；即使它已被 close_master 移出登记表，也不会误减新条目的引用。
+        with _registry_lock:
+            entry["refs"] -= 1
+            entry["last_used"] = time.monotonic()
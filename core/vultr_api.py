@@ -1,18 +1,56 @@
 """Vultr API 客户端模块。"""
+# 导入 math 模块以校验服务端给出的等待时长是否为有限值。
+import math
 # 导入 os 模块以便读取环境变量中的 API 密钥。
 import os
+# 导入 random 模块为退避等待加入随机抖动。
+import random
 # 导入 time 模块以实现指数退避等待。
 import time
-# 从 typing 模块导入 Dict 和 List 类型用于类型注解。
-from typing import Dict, List
+# 从 typing 模块导入 Dict、List 和 Tuple 类型用于类型注解。
+from typing import Dict, List, Tuple
 
 # 导入 requests 库用于执行 HTTP 请求。
 import requests
+# 导入 HTTPAdapter 以配置连接池大小。
+from requests.adapters import HTTPAdapter
+# 导入 urllib3 的 Retry，由本模块自行负责重试逻辑。
+from urllib3.util.retry import Retry
 
 # 定义默认的请求超时时间（连接超时 5 秒，读取超时 30 秒）。
 DEFAULT_TIMEOUT = (5, 30)
 # 定义最大重试次数以满足题目要求。
 MAX_RETRIES = 3
+# 定义遵循服务端 Retry-After 时单次等待的上限（秒）。
+MAX_RETRY_AFTER_SEC = 60.0
+# 定义实例列表每页条数，取 Vultr API 允许的上限以减少分页往返。
+LIST_PAGE_SIZE = 500
+
+# 定义实例列表中需要保留的字段及其缺省值，投影时按此顺序构造字典。
+_INSTANCE_FIELDS: Tuple[Tuple[str, object], ...] = (
+    ("id", ""),
+    ("label", ""),
+    ("main_ip", ""),
+    ("status", ""),
+    ("power_status", ""),
+    ("region", ""),
+    ("plan", ""),
+    ("os", ""),
+    ("ram", 0),
+    ("disk", 0),
+    ("vcpu_count", 0),
+    ("created_at", ""),
+)
+
+# 实例详情的条件请求缓存：(URL, API 密钥) -> (ETag, 实例信息)。
+_ETAG_CACHE: Dict[Tuple[str, str], Tuple[str, Dict]] = {}
+
+# 创建模块级会话，分页请求与后续详情查询复用同一条 keep-alive 的 TLS 连接。
+_SESSION = requests.Session()
+# 挂载连接池适配器；重试次数设为 0，重试仍由 _perform_request 统一控制。
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=Retry(total=0)))
+# 内容类型对所有请求相同，只需设置一次。
+_SESSION.headers["Content-Type"] = "application/json"
 
 
 def _build_url(api_base: str, path: str) -> str:
@@ -21,52 +59,87 @@ def _build_url(api_base: str, path: str) -> str:
     return f"{api_base.rstrip('/')}/{path.lstrip('/')}"
 
 
+# 定义一个内部帮助函数读取 VULTR_API_KEY，并将授权头挂到共享会话上。
+def _require_api_key() -> str:
+    # 从环境变量中读取 Vultr API 密钥。
+    api_key = os.environ.get("VULTR_API_KEY", "")
+    # 如果没有提供密钥，则抛出 ValueError 以便上层提示用户。
+    if not api_key:
+        raise ValueError("VULTR_API_KEY is not set")
+    # 授权头只在密钥变化时更新，其余请求直接复用会话上的头信息。
+    authorization = f"Bearer {api_key}"
+    if _SESSION.headers.get("Authorization") != authorization:
+        _SESSION.headers["Authorization"] = authorization
+    return api_key
+
+
 # 定义一个内部帮助函数负责带重试的 HTTP 请求。
-def _perform_request(method: str, url: str, headers: Dict[str, str], params: Dict[str, str] | None = None) -> requests.Response:
+def _perform_request(method: str, url: str, params: Dict[str, str] | None = None,
+                     headers: Dict[str, str] | None = None) -> requests.Response:
     # 使用 for 循环在允许的重试次数内尝试发送请求。
     for attempt in range(1, MAX_RETRIES + 1):
         # 记录当前重试的尝试序号，后续用于指数退避。
         try:
-            # 调用 requests.request 发送 HTTP 请求，传入方法、URL、头信息和查询参数。
-            response = requests.request(method, url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT)
-            # 如果响应状态码为 401、429 或 5xx，则视为需要重试的错误。
-            if response.status_code in {401, 429} or response.status_code >= 500:
-                # 当达到最大重试次数时直接返回响应以便调用者处理。
-                if attempt == MAX_RETRIES:
-                    return response
-                # 计算指数退避的等待时间，基础为 1 秒。
-                sleep_seconds = 2 ** (attempt - 1)
-                # 在等待前短暂休眠，避免触发限流。
-                time.sleep(sleep_seconds)
-                # 继续下一次重试。
-                continue
-            # 对于非重试错误或成功响应，直接返回响应。
-            return response
+            # 通过共享会话发送 HTTP 请求，公共头信息已挂在会话上，仅需附加本次请求特有的头。
+            response = _SESSION.request(method, url, params=params, headers=headers, timeout=DEFAULT_TIMEOUT)
         except requests.RequestException:
-            # 捕获请求异常以进行重试，若达到最大次数则重新抛出。
+            # 捕获请求异常以进行重试，若达到最大次数则直接重新抛出，不再等待。
             if attempt == MAX_RETRIES:
-                # 将异常重新抛出给调用者处理。
                 raise
-            # 计算指数退避的等待时间。
-            sleep_seconds = 2 ** (attempt - 1)
-            # 在下一次重试前等待指定时间。
-            time.sleep(sleep_seconds)
+            # 在下一次重试前按带抖动的指数退避等待。
+            time.sleep(_backoff_seconds(attempt))
+            continue
+        # 对于非重试错误或成功响应，以及最后一次尝试，直接返回响应以便调用者处理。
+        if response.status_code not in {401, 429} and response.status_code < 500:
+            return response
+        if attempt == MAX_RETRIES:
+            return response
+        # 429 时优先遵循服务端给出的 Retry-After，否则使用带抖动的指数退避。
+        time.sleep(_retry_after_seconds(response) or _backoff_seconds(attempt))
     # 理论上不会到达此处，添加返回语句满足类型检查要求。
     return response  # type: ignore[UnboundLocalError]
 
 
+# 定义一个内部帮助函数计算全抖动指数退避的等待时长：在 [0, 2 ** (attempt - 1)] 秒内随机取值。
+def _backoff_seconds(attempt: int) -> float:
+    return random.uniform(0, 1 << (attempt - 1))
+
+
+# 定义一个内部帮助函数读取 429 响应的 Retry-After 等待秒数，上限为 MAX_RETRY_AFTER_SEC；
+# 缺失、非数字或非有限值时返回 0，交由指数退避处理。
+def _retry_after_seconds(response: requests.Response) -> float:
+    # 仅 429 响应才遵循 Retry-After。
+    if response.status_code != 429:
+        return 0.0
+    try:
+        delay = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return 0.0
+    # nan/inf 会让 time.sleep 抛出异常，按缺失处理；过长的等待截断到上限，避免命令行长时间挂起。
+    if not math.isfinite(delay):
+        return 0.0
+    return min(max(delay, 0.0), MAX_RETRY_AFTER_SEC)
+
+
+# 定义一个内部帮助函数请求并解析实例列表的一页。
+def _fetch_instances_page(url: str, cursor: str | None) -> Dict:
+    # 构造查询参数，每页取最大条数，当 cursor 存在时带上它。
+    params = {"per_page": str(LIST_PAGE_SIZE)}
+    if cursor:
+        params["cursor"] = cursor
+    # 调用内部请求函数执行 HTTP 请求。
+    response = _perform_request("GET", url, params)
+    # 如果响应状态码不是 200，则抛出异常供上层处理。
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to list instances: {response.status_code} {response.text}")
+    # 将响应解析为 JSON 数据。
+    return response.json()
+
+
 # 定义函数用于列出所有 Vultr 实例。
 def list_instances(api_base: str) -> List[Dict]:
-    # 从环境变量中读取 Vultr API 密钥。
-    api_key = os.environ.get("VULTR_API_KEY", "")
-    # 如果没有提供密钥，则抛出 ValueError 以便上层提示用户。
-    if not api_key:
-        raise ValueError("VULTR_API_KEY is not set")
-    # 构造请求头，包含授权信息和内容类型。
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
+    # 校验 API 密钥并挂到共享会话上，缺失时抛出 ValueError 以便上层提示用户。
+    _require_api_key()
     # 构造实例列表接口的 URL。
     url = _build_url(api_base, "instances")
     # 初始化列表用于保存所有实例信息。
@@ -75,41 +148,15 @@ def list_instances(api_base: str) -> List[Dict]:
     cursor: str | None = None
     # 使用 while 循环处理分页。
     while True:
-        # 构造查询参数，当 cursor 存在时带上它。
-        params = {"cursor": cursor} if cursor else None
-        # 调用内部请求函数执行 HTTP 请求。
-        response = _perform_request("GET", url, headers, params)
-        # 如果响应状态码不是 200，则抛出异常供上层处理。
-        if response.status_code != 200:
-            raise RuntimeError(f"Failed to list instances: {response.status_code} {response.text}")
-        # 将响应解析为 JSON 数据。
-        data = response.json()
-        # 从 JSON 数据中提取实例列表，若不存在则使用空列表。
-        page_instances = data.get("instances", [])
-        # 遍历页面中的每个实例。
-        for item in page_instances:
-            # 按要求提取关键字段并构造新的字典。
-            instances.append(
-                {
-                    "id": item.get("id", ""),
-                    "label": item.get("label", ""),
-                    "main_ip": item.get("main_ip", ""),
-                    "status": item.get("status", ""),
-                    "power_status": item.get("power_status", ""),
-                    "region": item.get("region", ""),
-                    "plan": item.get("plan", ""),
-                    "os": item.get("os", ""),
-                    "ram": item.get("ram", 0),
-                    "disk": item.get("disk", 0),
-                    "vcpu_count": item.get("vcpu_count", 0),
-                    "created_at": item.get("created_at", ""),
-                }
-            )
-        # 从 meta 信息中读取下一页的 cursor。
-        meta = data.get("meta", {})
-        links = meta.get("links", {})
-        cursor = links.get("next")
-        # 如果没有下一页则跳出循环。
+        # 取得当前页的解析结果，请求失败时异常直接抛给调用方。
+        data = _fetch_instances_page(url, cursor)
+        # 按预定义的字段与默认值投影当前页的每个实例并批量追加。
+        instances.extend(
+            {key: item.get(key, default) for key, default in _INSTANCE_FIELDS}
+            for item in data.get("instances", [])
+        )
+        # 从 meta 信息中读取下一页的 cursor，不存在时结束循环。
+        cursor = data.get("meta", {}).get("links", {}).get("next")
         if not cursor:
             break
     # 返回收集到的所有实例。
@@ -118,22 +165,27 @@ def list_instances(api_base: str) -> List[Dict]:
 
 # 定义函数用于获取指定实例的详细信息。
 def get_instance_info(api_base: str, instance_id: str) -> Dict:
-    # 从环境变量中读取 Vultr API 密钥。
-    api_key = os.environ.get("VULTR_API_KEY", "")
-    # 如果密钥缺失则抛出异常提醒调用方。
-    if not api_key:
-        raise ValueError("VULTR_API_KEY is not set")
-    # 构造请求头以携带授权信息。
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
+    # 校验 API 密钥并挂到共享会话上，缺失时抛出异常提醒调用方。
+    api_key = _require_api_key()
     # 构造实例详情接口的 URL。
     url = _build_url(api_base, f"instances/{instance_id}")
+    # 已缓存过该实例时携带 If-None-Match，内容未变化时服务端只返回 304 而不带响应体。
+    cache_key = (url, api_key)
+    cached = _ETAG_CACHE.get(cache_key)
+    headers = {"If-None-Match": cached[0]} if cached else None
     # 调用内部请求函数获取实例详情。
-    response = _perform_request("GET", url, headers)
+    response = _perform_request("GET", url, headers=headers)
+    # 304 表示缓存仍然有效，直接返回缓存内容的副本。
+    if response.status_code == 304 and cached:
+        return dict(cached[1])
     # 如果响应状态码不是 200，则抛出异常。
     if response.status_code != 200:
         raise RuntimeError(f"Failed to get instance info: {response.status_code} {response.text}")
-    # 返回解析后的 JSON 数据中的实例信息。
-    return response.json().get("instance", {})
+    # 解析 JSON 数据中的实例信息。
+    instance = response.json().get("instance", {})
+    # 服务端提供 ETag 时记录下来，供下次条件请求使用。
+    etag = response.headers.get("ETag", "")
+    if etag:
+        _ETAG_CACHE[cache_key] = (etag, instance)
+    # 返回副本，避免调用方修改影响缓存内容。
+    return dict(instance)
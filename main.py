@@ -1,15 +1,23 @@
 # main.py
 # 该脚本是 VULTRagent 项目的入口文件，负责提供一个命令行菜单框架。
+# 导入 functools 模块以缓存重复计算的辅助函数结果。
+import functools
+# 导入 hashlib 模块以计算配置文件摘要，校验解析缓存是否仍然有效。
+import hashlib
 # 导入 json 模块以处理状态文件读写。
 import json
 # 导入 os 模块以便读取环境变量。
 import os
+# 导入 operator 模块以便批量提取实例字段。
+import operator
+# 导入 posixpath 模块以拼接远端（POSIX）路径。
+import posixpath
 # 导入 sys 模块，以便在需要时退出程序。
 import sys
+# 导入 tempfile 模块以原子方式写入配置解析缓存。
+import tempfile
 # 导入 time 模块用于测量 API 请求耗时。
 import time
-# 导入 re 模块以便在解析配置时处理 Windows 路径中的反斜杠。
-import re
 # 导入 string 模块用于处理十六进制字符集合。
 import string
 # 导入 subprocess 模块以捕获外部命令异常。
@@ -18,55 +26,25 @@ import subprocess
 import shlex
 # 导入 pathlib.Path 以便构建跨平台的文件路径。
 from pathlib import Path
-# 导入 typing 模块中的 Callable、Dict 和 List 类型用于类型注解。
-from typing import Callable, Dict, List, Tuple
-# 导入 requests 库以捕获网络请求异常。
-import requests
-# 导入 typer 库以构建命令行应用。
-import typer
+# 导入 typing 模块中的 TYPE_CHECKING、Callable、Dict、List、Optional 和 Tuple 用于类型注解。
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 # 导入 rich.console 中的 Console 类用于美观的终端输出。
 from rich.console import Console
 # 导入 rich.table 中的 Table 类用于展示菜单。
 from rich.table import Table
+# 导入 rich.text 中的 Text 类，用于构造无需 markup 解析的纯文本单元格。
+from rich.text import Text
 # 导入 rich.box 以选择更规整的菜单边框样式。
 from rich import box
-# 导入 yaml 库以读取配置模板。
-import yaml
-# 从 core.vultr_api 模块导入真实的 API 函数。
-from core.vultr_api import get_instance_info, list_instances
-# 从 core.remote_exec 模块导入 SSH、日志与 tmux 管理函数以及 rsync 安装工具。
-from core.remote_exec import (
-    run_ssh_command,
-    tail_remote_log,
-    tail_and_mirror_log,
-    stop_tmux_session,
-    has_tmux_session,
-    install_remote_rsync,
-    check_ssh_connection,
-)
-# 从 core.env_check 模块导入本地 rsync 检测函数。
-from core.env_check import ensure_local_rsync
-# 从 core.file_transfer 模块导入文件传输、结果回传与仓库部署函数。
-from core.file_transfer import (
-    upload_local_to_remote,
-    fetch_results_from_remote,
-    deploy_repo,
-    verify_entry,
-    print_deploy_summary,
-    make_local_results_dir,
-    rotate_remote_log,
-    cleanup_remote_outputs,
-    cleanup_remote_directories,
-    cleanup_remote_logs,
-    update_local_repo,
-)
-# 从 core.remote_bootstrap 模块导入远端部署与报告函数。
-from core.remote_bootstrap import upload_and_bootstrap, print_health_report
-# 从 core.asr_runner 模块导入占位函数。
-from core.asr_runner import run_asr_job
+# typer 仅在构建命令行应用或交互式提示时按需导入，这里只供类型注解使用。
+if TYPE_CHECKING:
+    import typer
+# 可选依赖 orjson 用于更快地读写状态文件，未安装时回退到标准库 json。
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# 创建 Typer 应用实例，关闭自动补全以保持菜单体验一致。
-app = typer.Typer(add_completion=False)
 # 创建 Console 实例以用于彩色输出。
 console = Console()
 
@@ -79,107 +57,167 @@ CONFIG_EXAMPLE_PATH = "config.example.yaml"
 LEGACY_REMOTE_INPUT_DIR = "/home/ubuntu/asr_inputs"
 LEGACY_REMOTE_OUTPUT_DIR = "/home/ubuntu/asr_outputs"
 
+# 定义项目根目录常量，只解析一次符号链接。
+_PROJECT_ROOT = Path(__file__).resolve().parent
 # 定义状态文件的路径常量。
-STATE_PATH = Path(__file__).resolve().parent / ".state.json"
+STATE_PATH = _PROJECT_ROOT / ".state.json"
+# 定义远端部署脚本的本地路径常量。
+BOOTSTRAP_SCRIPT_PATH = _PROJECT_ROOT / "scripts" / "bootstrap_remote.sh"
 # 定义 Vultr API 默认基础地址常量。
 DEFAULT_API_BASE = "https://api.vultr.com"
 # 定义全局缓存用于保存最近一次获取的实例列表。
 LAST_INSTANCE_CACHE: List[Dict] = []
 
+# 实例列表表格的列配置：(表头, add_column 关键字参数)，依次为行号、实例 ID、标签、主 IP、状态、电源、区域与计划。
+_INSTANCE_COLUMNS: Tuple[Tuple[str, Dict[str, str]], ...] = (
+    ("行号", {"justify": "right", "style": "cyan"}),
+    ("实例 ID", {"style": "magenta"}),
+    ("标签", {}),
+    ("主 IP", {}),
+    ("状态", {}),
+    ("电源", {}),
+    ("区域", {}),
+    ("计划", {}),
+)
+# 实例列表表格中各列对应的字段，list_instances 返回的字典总包含这些键。
+_INSTANCE_ROW_GETTER = operator.itemgetter("id", "label", "main_ip", "status", "power_status", "region", "plan")
+# 缓存最近一次解析的配置：((文件路径, 修改时间), 配置字典)。
+_CONFIG_CACHE: Optional[Tuple[Tuple[str, int], Dict]] = None
+# 缓存最近一次解析的状态文件：((修改时间, 文件大小), 状态字典)。
+_STATE_CACHE: Optional[Tuple[Tuple[int, int], Dict]] = None
+
+# 预先构造十六进制字符集合，校验 \x、\u、\U 转义序列时复用。
+_HEX_DIGITS = frozenset(string.hexdigits)
+# 定义 YAML 双引号字符串中合法的单字符转义（反斜杠自身由切分逻辑单独处理）。
+_SIMPLE_ESCAPES = frozenset('"/bfnrt')
+# 定义十六进制转义前缀与其后应跟随的十六进制位数。
+_HEX_ESCAPE_LENGTHS = {"x": 2, "u": 4, "U": 8}
+
 
 # 定义一个函数用于安全读取配置文件。
 def _escape_unknown_backslashes(value: str) -> Tuple[str, bool]:
     """修正 YAML 双引号字符串中未转义的反斜杠。"""
 
-    result: List[str] = []
-    i = 0
+    # 不含反斜杠时无需任何处理，直接返回原字符串。
+    if "\\" not in value:
+        return value, False
+    # 按反斜杠一次性切分，之后只需检查每个片段的开头，无需逐字符遍历。
+    segments = value.split("\\")
+    result: List[str] = [segments[0]]
     changed = False
-    hex_digits = set(string.hexdigits)
-
-    while i < len(value):
-        char = value[i]
-        if char != "\\":
-            result.append(char)
-            i += 1
-            continue
-
-        # 处理合法的 YAML 转义序列，保持原样。
-        if i + 1 < len(value):
-            nxt = value[i + 1]
-            if nxt in {'\\', '"', '/', 'b', 'f', 'n', 'r', 't'}:
-                result.append("\\")
-                result.append(nxt)
+    count = len(segments)
+    i = 1
+
+    while i < count:
+        segment = segments[i]
+        # 空片段表示紧跟着另一个反斜杠。
+        if not segment:
+            if i + 1 < count:
+                # 合法的 \\ 转义，两个反斜杠连同其后的片段保持原样。
+                result.append("\\\\")
+                result.append(segments[i + 1])
                 i += 2
                 continue
-            if nxt == 'x' and i + 3 < len(value) and all(
-                ch in hex_digits for ch in value[i + 2 : i + 4]
-            ):
-                result.append("\\")
-                result.append('x')
-                result.extend(value[i + 2 : i + 4])
-                i += 4
-                continue
-            if nxt == 'u' and i + 5 < len(value) and all(
-                ch in hex_digits for ch in value[i + 2 : i + 6]
-            ):
-                result.append("\\")
-                result.append('u')
-                result.extend(value[i + 2 : i + 6])
-                i += 6
-                continue
-            if nxt == 'U' and i + 9 < len(value) and all(
-                ch in hex_digits for ch in value[i + 2 : i + 10]
-            ):
-                result.append("\\")
-                result.append('U')
-                result.extend(value[i + 2 : i + 10])
-                i += 10
-                continue
+            # 字符串末尾孤立的反斜杠需要额外转义。
+            result.append("\\\\")
+            changed = True
+            i += 1
+            continue
 
-        # 其余情况视为普通反斜杠，需要额外转义。
-        result.append("\\\\")
-        if i + 1 < len(value):
-            result.append(value[i + 1])
-            i += 2
+        # 处理合法的 YAML 转义序列，保持原样：单字符转义直接查集合，\x、\u、\U 按查表得到的位数校验十六进制。
+        head = segment[0]
+        hex_length = _HEX_ESCAPE_LENGTHS.get(head, 0)
+        if head in _SIMPLE_ESCAPES or (
+            hex_length and len(segment) > hex_length and _HEX_DIGITS.issuperset(segment[1 : hex_length + 1])
+        ):
+            result.append("\\")
         else:
-            i += 1
-        changed = True
+            # 其余情况视为普通反斜杠，需要额外转义。
+            result.append("\\\\")
+            changed = True
+        result.append(segment)
+        i += 1
 
-    return "".join(result), changed
+    # 没有任何修正时结果与输入完全相同，直接返回原字符串而不再拼接。
+    if not changed:
+        return value, False
+    return "".join(result), True
 
 
-def _sanitize_windows_paths(yaml_text: str) -> str:
-    """尝试将双引号中的 Windows 路径自动转义。"""
+def _find_closing_quote(text: str, start: int) -> int:
+    """从 ``start`` 开始查找与之配对的右双引号，跳过 ``\\`` 转义，找不到时返回 -1。"""
 
-    pattern = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"')
-    changed_any = False
+    length = len(text)
+    while True:
+        quote = text.find('"', start)
+        # 只需关心右引号之前出现的反斜杠。
+        backslash = text.find("\\", start, quote if quote != -1 else length)
+        if backslash == -1:
+            return quote
+        # 反斜杠位于末尾或紧跟换行时，该双引号字符串不成立。
+        if backslash + 1 >= length or text[backslash + 1] == "\n":
+            return -1
+        # 跳过反斜杠及其转义的字符继续查找。
+        start = backslash + 2
 
-    def repl(match: re.Match) -> str:
-        nonlocal changed_any
-        original_content = match.group(1)
-        corrected, changed = _escape_unknown_backslashes(original_content)
-        if changed:
-            changed_any = True
-            return f'"{corrected}"'
-        return match.group(0)
 
-    sanitized = pattern.sub(repl, yaml_text)
-    return sanitized if changed_any else yaml_text
+def _sanitize_windows_paths(yaml_text: str) -> str:
+    """尝试将双引号中的 Windows 路径自动转义。"""
+
+    # 文本中没有反斜杠时无需修正，直接跳过扫描。
+    if "\\" not in yaml_text:
+        return yaml_text
+    # 以 str.find 在引号与反斜杠之间跳跃，单次扫描整段文本，仅对含反斜杠的字符串内容做修正。
+    parts: List[str] = []
+    copied_until = 0
+    position = yaml_text.find('"')
+    while position != -1:
+        closing = _find_closing_quote(yaml_text, position + 1)
+        if closing == -1:
+            # 当前引号未能配对，从下一个字符起继续寻找新的左引号。
+            position = yaml_text.find('"', position + 1)
+            continue
+        content = yaml_text[position + 1 : closing]
+        if "\\" in content:
+            corrected, changed = _escape_unknown_backslashes(content)
+            if changed:
+                parts.append(yaml_text[copied_until : position + 1])
+                parts.append(corrected)
+                copied_until = closing
+        position = yaml_text.find('"', closing + 1)
+
+    # 没有任何内容被修正时返回原文本。
+    if not parts:
+        return yaml_text
+    parts.append(yaml_text[copied_until:])
+    return "".join(parts)
 
 
 def _load_yaml_file(path: str) -> Dict:
     """读取 YAML 文件并在必要时自动修正 Windows 路径反斜杠。"""
 
-    with open(path, "r", encoding="utf-8") as handle:
-        yaml_text = handle.read()
+    # 仅在确实需要解析配置时才导入 yaml。
+    import yaml
 
+    # 优先使用基于 libyaml 的 C 解析器，不可用时回退到纯 Python 的 SafeLoader。
+    try:
+        from yaml import CSafeLoader as _YamlLoader
+    except ImportError:
+        from yaml import SafeLoader as _YamlLoader
+
+    # 以无缓冲方式一次性读入全部字节，避免解析器分块读取带来的多次 read 与双重缓冲；
+    # 字节直接交给解析器，由 libyaml 自行解码，省去一次 Python 层的整体解码。
+    with open(path, "rb", buffering=0) as handle:
+        raw = handle.read()
     try:
-        return yaml.safe_load(yaml_text) or {}
+        return yaml.load(raw, Loader=_YamlLoader) or {}
     except yaml.YAMLError as exc:
+        # 仅在解析失败时才把已读入的字节解码为文本，交给反斜杠修正逻辑处理，无需再次打开文件。
+        yaml_text = raw.decode("utf-8")
         sanitized = _sanitize_windows_paths(yaml_text)
         if sanitized != yaml_text:
             try:
-                data = yaml.safe_load(sanitized) or {}
+                data = yaml.load(sanitized, Loader=_YamlLoader) or {}
             except yaml.YAMLError as inner_exc:
                 raise RuntimeError(
                     "配置文件包含未转义的反斜杠且自动修正失败，请将 Windows 路径使用单引号或双反斜杠书写。"
@@ -201,8 +239,7 @@ def _normalize_remote_paths(config_data: Dict) -> None:
         return
 
     remote_conf = config_data.setdefault("remote", {})
-    project_dir = (remote_conf.get("project_dir", "") or "").strip()
-    project_dir = project_dir.rstrip("/")
+    project_dir = (remote_conf.get("project_dir", "") or "").strip().rstrip("/")
     derived_inputs = f"{project_dir}/audio" if project_dir else ""
     derived_outputs = f"{project_dir}/output" if project_dir else ""
 
@@ -238,29 +275,143 @@ def _normalize_remote_paths(config_data: Dict) -> None:
         )
 
 
+def _config_sidecar_path(path: str) -> Path:
+    """返回配置文件对应的 JSON 解析缓存路径。"""
+
+    return Path(f"{path}.cache.json")
+
+
+def _file_sha256(path: str) -> str:
+    """计算文件内容的 SHA-256 摘要。"""
+
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def _read_config_sidecar(path: str, stat: os.stat_result) -> Optional[Dict]:
+    """读取与配置文件匹配的 JSON 解析缓存，缓存缺失或已过期时返回 ``None``。"""
+
+    try:
+        raw = _config_sidecar_path(path).read_bytes()
+        cached = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or not isinstance(cached.get("data"), dict):
+        return None
+    # 大小不同说明内容必然已变化。
+    if cached.get("size") != stat.st_size:
+        return None
+    # 修改时间一致时直接复用，无需读取配置文件本身。
+    if cached.get("mtime_ns") == stat.st_mtime_ns:
+        return cached["data"]
+    # 网络文件系统或重新检出时修改时间并不可靠，此时按内容摘要判断，命中后刷新缓存中的时间戳。
+    try:
+        digest = _file_sha256(path)
+    except OSError:
+        return None
+    if cached.get("sha256") != digest:
+        return None
+    _write_config_sidecar(path, stat, cached["data"])
+    return cached["data"]
+
+
+def _write_config_sidecar(path: str, stat: os.stat_result, config_data: Dict) -> None:
+    """将解析后的配置写入 JSON 缓存，写入失败或内容无法用 JSON 无损表示时静默跳过。"""
+
+    try:
+        payload = json.dumps(
+            {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": _file_sha256(path),
+                "data": config_data,
+            },
+            ensure_ascii=False,
+        )
+    except (OSError, TypeError, ValueError):
+        # YAML 中的日期等类型无法序列化为 JSON，此时每次仍按 YAML 解析。
+        return
+    # 非字符串键等在 JSON 往返后会发生变化，这类配置同样不写缓存。
+    if json.loads(payload)["data"] != config_data:
+        return
+    sidecar = _config_sidecar_path(path)
+    tmp_name = ""
+    try:
+        # 先写入同目录的临时文件（权限仅限当前用户）再原子替换，避免并发启动读到写了一半的缓存。
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{sidecar.name}.", dir=sidecar.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(payload)
+        os.replace(tmp_name, sidecar)
+    except OSError:
+        # 缓存只是加速手段，目录不可写等情况下清理临时文件后直接放弃。
+        if tmp_name:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+
 def load_configuration() -> Dict:
-    # 该函数尝试读取真实配置文件，否则回退到示例配置。
-    if os.path.exists(CONFIG_PATH):
-        config_data = _load_yaml_file(CONFIG_PATH)
-        _normalize_remote_paths(config_data)
+    # 该函数尝试读取真实配置文件，否则回退到示例配置；一次 stat 同时完成存在性判断与修改时间读取。
+    global _CONFIG_CACHE
+    for path in (CONFIG_PATH, CONFIG_EXAMPLE_PATH):
+        # 不预先判断文件是否存在，直接读取并在 FileNotFoundError 时尝试下一个候选，
+        # 文件恰好在 stat 与解析之间被删除时同样回退，而不是把异常抛给调用方。
+        try:
+            stat = os.stat(path)
+            # 以文件路径与修改时间作为缓存键，文件未变化时直接复用上次解析的结果。
+            cache_key = (path, stat.st_mtime_ns)
+            if _CONFIG_CACHE is not None and _CONFIG_CACHE[0] == cache_key:
+                config_data = _CONFIG_CACHE[1]
+            else:
+                # 跨进程复用磁盘上的 JSON 解析缓存，仅在配置文件变化后才重新解析 YAML。
+                config_data = _read_config_sidecar(path, stat)
+                if config_data is None:
+                    config_data = _load_yaml_file(path)
+                    _write_config_sidecar(path, stat, config_data)
+                _normalize_remote_paths(config_data)
+                _CONFIG_CACHE = (cache_key, config_data)
+        except FileNotFoundError:
+            continue
+        # 如果真实配置不存在，则读取示例配置提醒用户。
+        if path == CONFIG_EXAMPLE_PATH:
+            console.print("未找到 config.yaml，使用示例配置运行占位菜单。", style="yellow", markup=False, highlight=False)
         return config_data
+    # 示例配置也被删除时不再尝试打开文件，直接返回空配置。
+    console.print("未找到 config.yaml 与 config.example.yaml，将以空配置运行。", style="red", markup=False, highlight=False)
+    return {}
 
-    # 如果真实配置不存在，则读取示例配置提醒用户。
-    config_data = _load_yaml_file(CONFIG_EXAMPLE_PATH)
-    _normalize_remote_paths(config_data)
-    console.print("[yellow]未找到 config.yaml，使用示例配置运行占位菜单。[/yellow]")
-    return config_data
-
-# 定义一个函数用于获取 Vultr API Key。
+# 定义一个函数用于获取 Vultr API Key，结果在本进程内缓存，缺失警告只输出一次。
+@functools.lru_cache(maxsize=1)
 def fetch_vultr_api_key() -> str:
     # 通过环境变量获取 API Key，符合安全要求。
     api_key = os.environ.get("VULTR_API_KEY", "")
     # 如果未配置 API Key，则打印警告。
     if not api_key:
-        console.print("[red]警告：未检测到 VULTR_API_KEY 环境变量，部分功能仅为占位演示。[/red]")
+        console.print(
+            "警告：未检测到 VULTR_API_KEY 环境变量，部分功能仅为占位演示。", style="red", markup=False, highlight=False
+        )
     # 返回 API Key（可能为空字符串）。
     return api_key
 
+# 定义辅助函数展开私钥路径中的 ~，同一路径只展开一次，留空时返回空字符串表示使用默认凭据。
+@functools.lru_cache(maxsize=8)
+def _expand_keyfile(keyfile: str) -> str:
+    return str(Path(keyfile).expanduser()) if keyfile else ""
+
+
+# 定义辅助函数在首次需要本地 rsync 时检测一次，后续调用直接复用结果，不再拖慢程序启动。
+@functools.lru_cache(maxsize=1)
+def _ensure_local_rsync_once() -> bool:
+    from core.env_check import ensure_local_rsync
+
+    # 调用 ensure_local_rsync 检测本地 rsync 是否可用，缺失时提供交互式安装。
+    ready = ensure_local_rsync(interactive=True)
+    if not ready:
+        # 当本地缺少 rsync 时给出警告提示，后续流程会自动回退到 scp。
+        console.print("[yellow]本地 rsync 未就绪，请确认安装后重启程序。[/yellow]")
+    return ready
+
+
 # 定义辅助函数以从配置中解析 Vultr API 基础地址。
 def resolve_api_base(config: Dict) -> str:
     # 尝试从配置中读取自定义的 API 地址。
@@ -269,37 +420,53 @@ def resolve_api_base(config: Dict) -> str:
 
 # 定义辅助函数将实例列表缓存到全局变量。
 def cache_instances(instances: List[Dict]) -> None:
-    # 首先清空现有缓存内容。
-    LAST_INSTANCE_CACHE.clear()
-    # 将新的实例逐个追加到缓存中。
-    LAST_INSTANCE_CACHE.extend(instances)
+    # 以一次切片赋值原地替换全部内容，列表对象保持不变，已持有引用的调用方同样能看到新数据。
+    LAST_INSTANCE_CACHE[:] = instances
 
 
 # 定义辅助函数从磁盘读取状态文件。
 def load_state() -> Dict:
-    # 如果状态文件不存在则抛出 FileNotFoundError。
-    if not STATE_PATH.exists():
-        raise FileNotFoundError("state file not found")
-    # 打开状态文件并读取 JSON 内容。
-    with STATE_PATH.open("r", encoding="utf-8") as handle:
-        # 使用 json.load 解析文件并返回状态字典。
-        return json.load(handle)
+    # 以修改时间与大小作为缓存键，文件未变化时只需一次 stat 即可复用上次解析的结果。
+    global _STATE_CACHE
+    try:
+        stat = STATE_PATH.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError("state file not found") from None
+    cache_key = (stat.st_mtime_ns, stat.st_size)
+    if _STATE_CACHE is None or _STATE_CACHE[0] != cache_key:
+        # 直接以字节读取并解析，json.loads 可自行识别 UTF-8，省去文本层的解码包装。
+        try:
+            raw = STATE_PATH.read_bytes()
+        except FileNotFoundError:
+            raise FileNotFoundError("state file not found") from None
+        _STATE_CACHE = (cache_key, orjson.loads(raw) if orjson is not None else json.loads(raw))
+    # 返回副本，避免调用方修改影响缓存内容。
+    return dict(_STATE_CACHE[1])
 
 
 # 定义辅助函数将状态写入磁盘。
 def save_state(state: Dict) -> None:
-    # 使用 with 语句安全地写入 JSON 文件。
-    with STATE_PATH.open("w", encoding="utf-8") as handle:
-        # 使用 json.dump 将状态内容写入磁盘。
-        json.dump(state, handle, ensure_ascii=False, indent=2)
+    global _STATE_CACHE
+    # 先在内存中序列化，再一次性以字节写入文件；orjson 直接产出 UTF-8 字节，格式与标准库输出一致。
+    if orjson is not None:
+        payload = orjson.dumps(state, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8")
+    STATE_PATH.write_bytes(payload)
+    # 写入后文件已变化，丢弃缓存，下次读取时重新解析。
+    _STATE_CACHE = None
 
 
 # 定义一个函数用于列出 Vultr 实例并展示表格。
 def handle_list_instances(config: Dict) -> None:
+    # 仅在真正访问 Vultr API 时才导入 requests 及其依赖，缩短菜单的冷启动时间。
+    import requests
+    from core.vultr_api import list_instances
+
     # 解析 Vultr API 基础地址。
     api_base = resolve_api_base(config)
-    # 记录开始时间以计算请求耗时。
-    start_time = time.perf_counter()
+    # 以整数纳秒记录开始时间以计算请求耗时。
+    start_ns = time.perf_counter_ns()
     try:
         # 调用 list_instances 获取实例列表。
         instances = list_instances(api_base)
@@ -315,44 +482,34 @@ def handle_list_instances(config: Dict) -> None:
         # 捕获 API 返回的错误并输出具体信息。
         console.print(f"[red]列出实例失败：{exc}[/red]")
         return
-    # 计算请求耗时。
-    duration = time.perf_counter() - start_time
+    # 以整数运算换算出请求耗时（毫秒）。
+    duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
     # 将成功获取的实例列表写入缓存。
     cache_instances(instances)
+    # 输出被管道或重定向时跳过表格排版，以制表符分隔的纯文本逐行输出，便于其他工具处理。
+    if not console.is_terminal:
+        lines = ["\t".join(header for header, _ in _INSTANCE_COLUMNS)]
+        lines.extend(
+            "\t".join((str(index), *("" if value is None else str(value) for value in fields)))
+            for index, fields in enumerate(map(_INSTANCE_ROW_GETTER, instances), start=1)
+        )
+        lines.append(f"共 {len(instances)} 个实例，API 耗时 {duration_ms} ms")
+        sys.stdout.write("\n".join(lines) + "\n")
+        return
     # 创建 Rich 表格展示信息。
     table = Table(title="Vultr 实例列表")
-    # 添加行号列帮助用户选择实例。
-    table.add_column("行号", justify="right", style="cyan")
-    # 添加实例 ID 列。
-    table.add_column("实例 ID", style="magenta")
-    # 添加标签列。
-    table.add_column("标签")
-    # 添加主 IP 列。
-    table.add_column("主 IP")
-    # 添加状态列。
-    table.add_column("状态")
-    # 添加电源状态列。
-    table.add_column("电源")
-    # 添加区域列。
-    table.add_column("区域")
-    # 添加计划列。
-    table.add_column("计划")
-    # 遍历实例列表并逐行写入表格。
-    for index, instance in enumerate(instances, start=1):
-        table.add_row(
-            str(index),
-            instance.get("id", "-"),
-            instance.get("label", "-"),
-            instance.get("main_ip", "-"),
-            instance.get("status", "-"),
-            instance.get("power_status", "-"),
-            instance.get("region", "-"),
-            instance.get("plan", "-"),
-        )
+    # 按预定义的列配置依次添加表头。
+    for header, column_options in _INSTANCE_COLUMNS:
+        table.add_column(header, **column_options)
+    # 先一次性取出每行的各列数据，再以纯文本单元格逐行写入表格：Text 不经过 markup 解析，
+    # 渲染时省去逐格解析，标签中出现的方括号也会原样显示。
+    add_row = table.add_row
+    for index, fields in enumerate(map(_INSTANCE_ROW_GETTER, instances), start=1):
+        add_row(Text(str(index)), *(Text("" if value is None else str(value)) for value in fields))
     # 打印表格。
     console.print(table)
     # 在表格下方输出实例总数和 API 耗时。
-    console.print(f"[bold blue]共 {len(instances)} 个实例，API 耗时 {duration:.2f} 秒[/bold blue]")
+    console.print(f"[bold blue]共 {len(instances)} 个实例，API 耗时 {duration_ms} ms[/bold blue]")
 
 
 # 定义函数用于选择实例并保存到状态文件。
@@ -364,6 +521,9 @@ def handle_select_instance(config: Dict) -> None:
         # 如果再次尝试后仍然没有数据则直接返回。
         if not LAST_INSTANCE_CACHE:
             return
+    # typer 仅用于此处的交互式提示，按需导入。
+    import typer
+
     # 提示用户输入要选择的行号。
     choice = typer.prompt("请输入要选择的实例行号")
     try:
@@ -386,6 +546,18 @@ def handle_select_instance(config: Dict) -> None:
         "ip": instance.get("main_ip", ""),
         "label": instance.get("label", ""),
     }
+    # 切换到另一台实例时，主动关闭上一台实例的复用主连接，避免其在后台空占连接直到超时。
+    try:
+        previous_ip = load_state().get("ip", "")
+    except (OSError, json.JSONDecodeError):
+        previous_ip = ""
+    if previous_ip and previous_ip != state_payload["ip"]:
+        ssh_conf = config.get("ssh", {}) if config else {}
+        previous_user = ssh_conf.get("user", "") or os.environ.get("VULTR_REMOTE_USER", "").strip()
+        if previous_user:
+            from core.remote_exec import close_ssh_mux
+
+            close_ssh_mux(previous_user, previous_ip, _expand_keyfile(ssh_conf.get("keyfile", "")) or None)
     try:
         # 将状态写入磁盘。
         save_state(state_payload)
@@ -401,6 +573,10 @@ def handle_select_instance(config: Dict) -> None:
 
 # 定义函数用于查看当前实例详情。
 def handle_show_instance_details(config: Dict) -> None:
+    # 与实例列表相同，按需导入 requests 与 Vultr API 客户端。
+    import requests
+    from core.vultr_api import get_instance_info
+
     try:
         # 尝试从状态文件读取当前实例信息。
         state = load_state()
@@ -464,6 +640,9 @@ def handle_show_instance_details(config: Dict) -> None:
 
 # 定义处理 SSH 测试的函数。
 def handle_test_ssh(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core.remote_exec import run_ssh_command
+
     # 若未加载配置文件，则无法执行 SSH 测试。
     if not config:
         console.print("[red]未加载配置文件，请先创建 config.yaml。[/red]")
@@ -476,7 +655,7 @@ def handle_test_ssh(config: Dict) -> None:
         return
 
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
 
     target_host = ""
     host_source = ""
@@ -525,6 +704,7 @@ def handle_test_ssh(config: Dict) -> None:
             user=ssh_user,
             keyfile=ssh_key_path or None,
             command=remote_command,
+            collect_output=False,
         )
     except OSError as exc:
         console.print(f"[red]执行 ssh 命令失败：{exc}[/red]")
@@ -540,6 +720,9 @@ def handle_test_ssh(config: Dict) -> None:
 def handle_diagnose_ssh(config: Dict) -> None:
     """通过核心模块执行 SSH 连通性诊断并输出日志路径。"""
 
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core.remote_exec import check_ssh_connection
+
     # 若配置未加载，则无法获取 SSH 连接信息。
     if not config:
         console.print("[red]未加载配置文件，无法执行 SSH 诊断。[/red]")
@@ -561,7 +744,7 @@ def handle_diagnose_ssh(config: Dict) -> None:
 
     # 解析私钥路径并展开 ~，若留空则表示使用默认凭据。
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
 
     # 尝试从 .state.json 中读取最近选择的实例 IP。
     try:
@@ -609,6 +792,11 @@ def handle_diagnose_ssh(config: Dict) -> None:
 
 # 定义运行远端环境部署的函数。
 def handle_remote_bootstrap(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core import ssh_pool
+    from core.remote_bootstrap import upload_and_bootstrap, print_health_report
+    from core.remote_exec import install_remote_rsync
+
     # 首先尝试读取状态文件，获取当前选择的实例信息。
     try:
         state = load_state()
@@ -644,29 +832,31 @@ def handle_remote_bootstrap(config: Dict) -> None:
     # 解析私钥路径，允许留空以使用默认凭据。
     ssh_key = ssh_conf.get("keyfile", "") or os.environ.get("VULTR_REMOTE_KEYFILE", "")
     # 如果用户提供了私钥路径，则展开 ~ 以获得绝对路径。
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
     # 构造本地脚本路径并确保其存在。
-    local_script_path = Path(__file__).resolve().parent / "scripts" / "bootstrap_remote.sh"
+    local_script_path = BOOTSTRAP_SCRIPT_PATH
     # 设置远端临时脚本路径，可通过配置覆盖，默认位于 /tmp。
     remote_tmp_path = config.get("remote", {}).get("bootstrap_tmp_path", "/tmp/vultragentsvc_bootstrap.sh")
     # 在终端提示用户正在执行的操作。
     console.print(f"[blue]正在将部署脚本上传到 {ip_address} …[/blue]")
     try:
-        # 在部署脚本之前确保远端 rsync 已就绪。
-        install_remote_rsync(
-            user=ssh_user,
-            host=ip_address,
-            keyfile=ssh_key_path or None,
-        )
-        # 调用核心函数上传脚本并执行远端部署流程。
-        report = upload_and_bootstrap(
-            user=ssh_user,
-            host=ip_address,
-            keyfile=ssh_key_path,
-            local_script_path=str(local_script_path),
-            remote_tmp_path=remote_tmp_path,
-            config=config,
-        )
+        # 在 rsync 检测、脚本上传与远端执行的全过程中持有主连接引用，各步骤共享一次握手。
+        with ssh_pool.acquire(ssh_user, ip_address, ssh_key_path or None):
+            # 在部署脚本之前确保远端 rsync 已就绪。
+            install_remote_rsync(
+                user=ssh_user,
+                host=ip_address,
+                keyfile=ssh_key_path or None,
+            )
+            # 调用核心函数上传脚本并执行远端部署流程。
+            report = upload_and_bootstrap(
+                user=ssh_user,
+                host=ip_address,
+                keyfile=ssh_key_path,
+                local_script_path=str(local_script_path),
+                remote_tmp_path=remote_tmp_path,
+                config=config,
+            )
     except FileNotFoundError as exc:
         # 当脚本缺失时向用户输出明确的错误提示。
         console.print(f"[red]远端部署脚本缺失：{exc}[/red]")
@@ -684,6 +874,9 @@ def handle_remote_bootstrap(config: Dict) -> None:
 
 # 定义部署 ASR 仓库的函数。
 def handle_deploy_repo(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core.file_transfer import deploy_repo, print_deploy_summary, update_local_repo, verify_entry
+
     # 在执行部署前尝试读取状态文件，确保已经选择实例。
     try:
         # 尝试解析 .state.json 获取目标实例信息。
@@ -712,7 +905,7 @@ def handle_deploy_repo(config: Dict) -> None:
         return
     # 解析私钥路径，允许使用默认 ssh-agent。
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
     # 读取 Git 配置以获取仓库地址与分支。
     git_conf = config.get("git", {}) if config else {}
     repo_url = git_conf.get("repo_url", "")
@@ -769,6 +962,8 @@ def handle_deploy_repo(config: Dict) -> None:
         # 捕获本地执行 ssh/git 命令时的系统错误。
         console.print(f"[red]执行远端部署时出现系统错误：{exc}[/red]")
         return
+    # 预先拼接入口文件的远端路径，供下方两种占位结果共用。
+    entry_path = posixpath.join(project_dir, entry_name or "asr_quickstart.py")
     # 根据部署结果决定是否继续校验入口文件。
     if deploy_info.get("ok"):
         try:
@@ -786,7 +981,7 @@ def handle_deploy_repo(config: Dict) -> None:
             verify_info = {
                 "exists": False,
                 "py_compiles": False,
-                "path": f"{project_dir.rstrip('/')}/{entry_name}",
+                "path": entry_path,
                 "messages": ["入口校验时发生 ssh 错误。"],
             }
     else:
@@ -794,7 +989,7 @@ def handle_deploy_repo(config: Dict) -> None:
         verify_info = {
             "exists": False,
             "py_compiles": False,
-            "path": f"{project_dir.rstrip('/')}/{entry_name}",
+            "path": entry_path,
             "messages": ["仓库部署未完成，未执行入口检查。"],
         }
     # 打印部署摘要信息，包含分支、提交与入口校验结果。
@@ -811,10 +1006,16 @@ def handle_deploy_repo(config: Dict) -> None:
 
 # 定义上传素材到远端的函数。
 def handle_upload_materials(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core import ssh_pool
+    from core.file_transfer import upload_local_to_remote
+
     # 在执行前检查配置是否存在。
     if not config:
         console.print("[red]未加载配置文件，请先创建 config.yaml。[/red]")
         return
+    # 首次使用时检测本地 rsync，结果在本进程内缓存。
+    _ensure_local_rsync_once()
     try:
         # 读取状态文件获取当前实例信息。
         state = load_state()
@@ -836,7 +1037,7 @@ def handle_upload_materials(config: Dict) -> None:
         console.print("[red]配置文件缺少 ssh.user，请补全后重试。[/red]")
         return
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
     # 获取远端 inputs 目录配置。
     remote_conf = config.get("remote", {})
     inputs_dir = remote_conf.get("inputs_dir", "")
@@ -875,12 +1076,19 @@ def handle_upload_materials(config: Dict) -> None:
     ssh_hint = "ssh"
     if ssh_key_path:
         ssh_hint += f" -i {shlex.quote(ssh_key_path)}"
+    # 主连接仍存活时，提示命令直接复用其控制套接字，省去一次握手。
+    if ssh_pool.master_active(f"{ssh_user}@{ip_address}", keyfile=ssh_key_path or None):
+        control_path = ssh_pool.control_path(f"{ssh_user}@{ip_address}", keyfile=ssh_key_path or None)
+        ssh_hint += f" -o ControlPath={shlex.quote(control_path)}"
     remote_find = f"find {shlex.quote(inputs_dir)} -type f | wc -l"
     ssh_hint += f" {ssh_user}@{ip_address} \"{remote_find}\""
     console.print(f"[blue]可选统计命令：{ssh_hint}[/blue]")
 
 # 定义在 tmux 中后台运行 ASR 的函数。
 def handle_run_asr_tmux(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core.asr_runner import run_asr_job
+
     # 校验配置是否加载。
     if not config:
         console.print("[red]未加载配置文件，请先创建 config.yaml。[/red]")
@@ -906,7 +1114,7 @@ def handle_run_asr_tmux(config: Dict) -> None:
         console.print("[red]配置文件缺少 ssh.user，请补全后重试。[/red]")
         return
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
     # 输出启动摘要。
     console.print(f"[blue]即将在 {ip_address} 的 tmux 中运行 ASR 任务。[/blue]")
     try:
@@ -928,6 +1136,9 @@ def handle_run_asr_tmux(config: Dict) -> None:
 
 # 定义实时查看远端日志的函数。
 def handle_tail_logs(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core.remote_exec import tail_and_mirror_log, tail_remote_log
+
     # 校验配置是否加载。
     if not config:
         console.print("[red]未加载配置文件，请先创建 config.yaml。[/red]")
@@ -953,7 +1164,7 @@ def handle_tail_logs(config: Dict) -> None:
         console.print("[red]配置文件缺少 ssh.user，请补全后重试。[/red]")
         return
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
     # 获取日志文件路径。
     remote_conf = config.get("remote", {})
     log_file = remote_conf.get("log_file", "")
@@ -974,6 +1185,8 @@ def handle_tail_logs(config: Dict) -> None:
     console.print(f"[blue]开始实时查看 {ip_address}:{log_file}，按 Ctrl+C 结束。[/blue]")
     try:
         if mirror_on_view:
+            # 镜像依赖本地 rsync，首次使用时检测一次。
+            _ensure_local_rsync_once()
             # 当启用镜像时，调用增强函数同步日志到本地。
             exit_code = tail_and_mirror_log(
                 user=ssh_user,
@@ -1003,10 +1216,16 @@ def handle_tail_logs(config: Dict) -> None:
 
 # 定义回传 ASR 结果的函数。
 def handle_fetch_results(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core import ssh_pool
+    from core.file_transfer import fetch_results_from_remote, make_local_results_dir, run_remote_cleanup
+
     # 若未加载配置文件则无法继续操作。
     if not config:
         console.print("[red]未加载配置文件，请先创建 config.yaml。[/red]")
         return
+    # 首次使用时检测本地 rsync，结果在本进程内缓存。
+    _ensure_local_rsync_once()
     try:
         # 读取状态文件以确定目标实例。
         state = load_state()
@@ -1030,7 +1249,7 @@ def handle_fetch_results(config: Dict) -> None:
         console.print("[red]配置文件缺少 ssh.user，请补全后再试。[/red]")
         return
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
     # 解析远端结果目录。
     remote_conf = config.get("remote", {})
     outputs_dir = remote_conf.get("outputs_dir", "")
@@ -1047,6 +1266,7 @@ def handle_fetch_results(config: Dict) -> None:
     backoff = transfer_conf.get("retry_backoff_sec", 3)
     verify_manifest = transfer_conf.get("verify_manifest", True)
     manifest_name = transfer_conf.get("manifest_name", "_manifest.txt")
+    parallel_channels = transfer_conf.get("parallel_channels", 4)
     # 将数值型配置转换为整数，并处理潜在异常。
     try:
         retries = int(retries)
@@ -1056,6 +1276,10 @@ def handle_fetch_results(config: Dict) -> None:
         backoff = int(backoff)
     except (TypeError, ValueError):
         backoff = 3
+    try:
+        parallel_channels = int(parallel_channels)
+    except (TypeError, ValueError):
+        parallel_channels = 4
     # 构建本地结果目录并展示路径。
     local_results_dir = make_local_results_dir(
         results_root=results_root,
@@ -1069,83 +1293,89 @@ def handle_fetch_results(config: Dict) -> None:
         console.print(
             f"[blue]仅会下载符合模式 {download_glob} 的文件。[/blue]"
         )
-    # 调用核心函数执行回传与重试逻辑。
-    try:
-        result = fetch_results_from_remote(
-            user=ssh_user,
-            host=ip_address,
-            remote_outputs_dir=outputs_dir,
-            local_results_dir=local_results_dir,
-            keyfile=ssh_key_path or None,
-            pattern=download_glob,
-            retries=max(retries, 0),
-            backoff_sec=max(backoff, 1),
-            verify_manifest=bool(verify_manifest),
-            manifest_name=manifest_name,
-            remote_project_dir=project_dir,
-            remote_inputs_dir=inputs_dir,
-        )
-    except (subprocess.CalledProcessError, OSError) as exc:
-        console.print(f"[red]回传过程中发生错误：{exc}[/red]")
-        console.print("[yellow]请检查网络连通性、磁盘空间与 SSH 权限后重试。[/yellow]")
-        return
-    # 输出汇总信息，包含目录、校验结果与缺失统计。
-    if result.get("ok"):
-        console.print("[green]✅ 结果回传完成。[/green]")
-    else:
-        console.print("[yellow]⚠️ 回传完成，但清单校验存在异常。[/yellow]")
-    console.print(f"[cyan]本地结果目录：{result.get('local_dir')}[/cyan]")
-    if result.get("manifest"):
-        console.print(f"[cyan]本地清单文件：{result.get('manifest')}[/cyan]")
-    if bool(verify_manifest):
-        if result.get("verified"):
-            console.print("[green]清单校验：通过。[/green]")
-        else:
-            missing_count = len(result.get("missing", []))
-            mismatch_count = len(result.get("size_mismatch", []))
-            console.print(
-                f"[yellow]清单校验未通过，缺失 {missing_count} 个文件，大小不匹配 {mismatch_count} 个。[/yellow]"
+    # 回传、清单校验与可选的远端清理共享同一条复用主连接，整个流程只需一次 SSH 握手。
+    with ssh_pool.acquire(ssh_user, ip_address, ssh_key_path or None):
+        # 调用核心函数执行回传与重试逻辑。
+        try:
+            result = fetch_results_from_remote(
+                user=ssh_user,
+                host=ip_address,
+                remote_outputs_dir=outputs_dir,
+                local_results_dir=local_results_dir,
+                keyfile=ssh_key_path or None,
+                pattern=download_glob,
+                retries=max(retries, 0),
+                backoff_sec=max(backoff, 1),
+                verify_manifest=bool(verify_manifest),
+                manifest_name=manifest_name,
+                remote_project_dir=project_dir,
+                remote_inputs_dir=inputs_dir,
+                parallel_channels=max(parallel_channels, 1),
             )
-            if missing_count:
-                console.print(f"[yellow]缺失文件示例：{result.get('missing')[:5]}[/yellow]")
-            if mismatch_count:
+        except (subprocess.CalledProcessError, OSError) as exc:
+            console.print(f"[red]回传过程中发生错误：{exc}[/red]")
+            console.print("[yellow]请检查网络连通性、磁盘空间与 SSH 权限后重试。[/yellow]")
+            return
+        # 输出汇总信息，包含目录、校验结果与缺失统计。
+        if result.get("ok"):
+            console.print("[green]✅ 结果回传完成。[/green]")
+        else:
+            console.print("[yellow]⚠️ 回传完成，但清单校验存在异常。[/yellow]")
+        console.print(f"[cyan]本地结果目录：{result.get('local_dir')}[/cyan]")
+        if result.get("manifest"):
+            console.print(f"[cyan]本地清单文件：{result.get('manifest')}[/cyan]")
+        if result.get("skipped"):
+            console.print(f"[cyan]已跳过 {len(result['skipped'])} 个未变化文件（复用上次回传结果）。[/cyan]")
+        if bool(verify_manifest):
+            if result.get("verified"):
+                console.print("[green]清单校验：通过。[/green]")
+            else:
+                missing_count = len(result.get("missing", []))
+                mismatch_count = len(result.get("size_mismatch", []))
                 console.print(
-                    f"[yellow]大小不一致示例：{result.get('size_mismatch')[:3]}[/yellow]"
+                    f"[yellow]清单校验未通过，缺失 {missing_count} 个文件，大小不匹配 {mismatch_count} 个。[/yellow]"
                 )
-    # 根据配置执行可选的清理动作。
-    cleanup_conf = config.get("cleanup", {})
-    if result.get("ok"):
-        if cleanup_conf.get("rotate_remote_logs"):
-            log_file = remote_conf.get("log_file", "")
-            keep_logs = cleanup_conf.get("keep_log_backups", 5)
-            try:
-                keep_logs = int(keep_logs)
-            except (TypeError, ValueError):
-                keep_logs = 5
-            if log_file:
-                rotate_remote_log(
-                    user=ssh_user,
-                    host=ip_address,
-                    log_path=log_file,
-                    keep=max(keep_logs, 1),
-                    keyfile=ssh_key_path or None,
-                )
-            else:
-                console.print("[yellow]未配置 remote.log_file，跳过日志轮转。[/yellow]")
-        if cleanup_conf.get("remove_remote_outputs"):
-            cleanup_remote_outputs(
+                if missing_count:
+                    console.print(f"[yellow]缺失文件示例：{result.get('missing')[:5]}[/yellow]")
+                if mismatch_count:
+                    console.print(
+                        f"[yellow]大小不一致示例：{result.get('size_mismatch')[:3]}[/yellow]"
+                    )
+        # 根据配置执行可选的清理动作。
+        cleanup_conf = config.get("cleanup", {})
+        if result.get("ok"):
+            rotate_log_path = ""
+            keep_logs = 5
+            if cleanup_conf.get("rotate_remote_logs"):
+                log_file = remote_conf.get("log_file", "")
+                keep_logs = cleanup_conf.get("keep_log_backups", 5)
+                try:
+                    keep_logs = int(keep_logs)
+                except (TypeError, ValueError):
+                    keep_logs = 5
+                if log_file:
+                    rotate_log_path = log_file
+                else:
+                    console.print("[yellow]未配置 remote.log_file，跳过日志轮转。[/yellow]")
+            # 日志轮转与 outputs 清理合并为一次远端调用。
+            run_remote_cleanup(
                 user=ssh_user,
                 host=ip_address,
-                outputs_dir=outputs_dir,
                 keyfile=ssh_key_path or None,
+                rotate_log_path=rotate_log_path,
+                keep_logs=max(keep_logs, 1),
+                directories=[outputs_dir] if cleanup_conf.get("remove_remote_outputs") else (),
             )
-    else:
-        console.print("[yellow]检测到回传存在异常，已跳过远端清理操作。[/yellow]")
+        else:
+            console.print("[yellow]检测到回传存在异常，已跳过远端清理操作。[/yellow]")
     # 给出下一步建议。
     console.print("[blue]可继续执行菜单 11 停止远端任务或查看结果目录。[/blue]")
 
 # 定义停止或清理远端任务的函数。
 def handle_cleanup_remote(config: Dict) -> None:
+    # 仅在执行该操作时才导入对应的 core 模块，缩短菜单的冷启动时间。
+    from core.file_transfer import run_remote_cleanup
+
     # 校验配置是否加载。
     if not config:
         console.print("[red]未加载配置文件，请先创建 config.yaml。[/red]")
@@ -1172,7 +1402,7 @@ def handle_cleanup_remote(config: Dict) -> None:
         console.print("[red]配置文件缺少 ssh.user，请补全后再试。[/red]")
         return
     ssh_key = ssh_conf.get("keyfile", "")
-    ssh_key_path = str(Path(ssh_key).expanduser()) if ssh_key else ""
+    ssh_key_path = _expand_keyfile(ssh_key)
     # 读取远端目录与 tmux 配置。
     remote_conf = config.get("remote", {})
     session_name = remote_conf.get("tmux_session", "")
@@ -1184,24 +1414,12 @@ def handle_cleanup_remote(config: Dict) -> None:
     console.print(
         f"[blue]正在处理 {instance_label} ({ip_address}) 的后台任务与清理操作。[/blue]"
     )
-    # 如果配置了 tmux 会话，则先检测并尝试停止。
-    if session_name:
-        exists = has_tmux_session(
-            user=ssh_user,
-            host=ip_address,
-            session=session_name,
-            keyfile=ssh_key_path or None,
-        )
-        if exists:
-            stop_tmux_session(
-                user=ssh_user,
-                host=ip_address,
-                session=session_name,
-                keyfile=ssh_key_path or None,
-            )
-    else:
+    # 先确定各清理步骤的参数，跳过的步骤在本地直接提示。
+    if not session_name:
         console.print("[yellow]未配置 remote.tmux_session，跳过 tmux 停止步骤。[/yellow]")
-    # 根据配置执行日志轮转。
+    # 根据配置决定是否执行日志轮转。
+    rotate_log_path = ""
+    keep_logs = 5
     if cleanup_conf.get("rotate_remote_logs"):
         keep_logs = cleanup_conf.get("keep_log_backups", 5)
         try:
@@ -1209,21 +1427,15 @@ def handle_cleanup_remote(config: Dict) -> None:
         except (TypeError, ValueError):
             keep_logs = 5
         if log_file:
-            rotate_remote_log(
-                user=ssh_user,
-                host=ip_address,
-                log_path=log_file,
-                keep=max(keep_logs, 1),
-                keyfile=ssh_key_path or None,
-            )
+            rotate_log_path = log_file
         else:
             console.print("[yellow]未配置 remote.log_file，跳过日志轮转。[/yellow]")
-    # 根据配置执行 outputs 目录清理。
+    # 根据配置决定 outputs 等目录的清理范围。
     clear_outputs = bool(cleanup_conf.get("remove_remote_outputs"))
     raw_clear_logs = cleanup_conf.get("clear_remote_logs")
     clear_logs = clear_outputs if raw_clear_logs is None else bool(raw_clear_logs)
+    cleanup_targets: List[str] = []
     if clear_outputs:
-        cleanup_targets = []
         if outputs_dir:
             cleanup_targets.append(outputs_dir)
             alt_output = str(Path(outputs_dir).with_name("out"))
@@ -1233,57 +1445,57 @@ def handle_cleanup_remote(config: Dict) -> None:
             cleanup_targets.append(str(Path(project_dir) / "out"))
         if inputs_dir:
             cleanup_targets.append(inputs_dir)
-        if cleanup_targets:
-            cleanup_remote_directories(
-                user=ssh_user,
-                host=ip_address,
-                directories=cleanup_targets,
-                keyfile=ssh_key_path or None,
-            )
-        else:
+        if not cleanup_targets:
             console.print("[yellow]未找到可清理的远端目录，跳过数据清理步骤。[/yellow]")
     else:
         console.print(
             "[yellow]未启用 cleanup.remove_remote_outputs，跳过远端数据清理。[/yellow]"
         )
-
+    # 根据配置决定是否清理远端日志。
+    clear_log_path = ""
     if clear_logs:
         if log_file:
-            cleanup_remote_logs(
-                user=ssh_user,
-                host=ip_address,
-                log_path=log_file,
-                keyfile=ssh_key_path or None,
-            )
+            clear_log_path = log_file
         else:
             console.print("[yellow]未配置 remote.log_file，跳过远端日志清理。[/yellow]")
     elif log_file:
         console.print(
             "[yellow]未启用 cleanup.clear_remote_logs，保留远端日志文件。[/yellow]"
         )
+    # tmux 停止、日志轮转、目录清理与日志清理合并为一个远端脚本，只需一次 SSH 往返。
+    run_remote_cleanup(
+        user=ssh_user,
+        host=ip_address,
+        keyfile=ssh_key_path or None,
+        session=session_name,
+        rotate_log_path=rotate_log_path,
+        keep_logs=max(keep_logs, 1),
+        directories=cleanup_targets,
+        clear_log_path=clear_log_path,
+    )
     # 输出总结信息。
     console.print("[blue]清理流程结束，可根据需要重新运行 ASR 或退出程序。[/blue]")
 
 # 建立菜单选项与处理函数的映射。
-MENU_ACTIONS: Dict[str, Dict[str, Callable[[Dict], None]]] = {
-    # 每个键为用户输入的序号，值为包含描述和处理函数的字典。
-    "1": {"label": "列出 Vultr 实例", "handler": handle_list_instances},
-    "2": {"label": "选择当前实例并保存", "handler": handle_select_instance},
-    "3": {"label": "查看当前实例详情", "handler": handle_show_instance_details},
-    "4": {"label": "连接并测试 SSH", "handler": handle_test_ssh},
-    "5": {"label": "一键环境部署/检查（远端）", "handler": handle_remote_bootstrap},
-    "6": {"label": "部署/更新 ASR 仓库到远端", "handler": handle_deploy_repo},
-    "7": {"label": "在 tmux 中后台运行 asr_quickstart.py", "handler": handle_run_asr_tmux},
-    "8": {"label": "上传本地素材到远端输入目录", "handler": handle_upload_materials},
-    "9": {"label": "实时查看远端日志", "handler": handle_tail_logs},
-    "10": {"label": "回传 ASR 结果到本地", "handler": handle_fetch_results},
-    "11": {"label": "停止/清理远端任务", "handler": handle_cleanup_remote},
-    "12": {"label": "退出", "handler": lambda config: sys.exit(0)},  # 使用匿名函数统一出口逻辑。
-    "13": {"label": "诊断远端 SSH 状态", "handler": handle_diagnose_ssh},
+MENU_ACTIONS: Dict[str, Tuple[str, Callable[[Dict], None]]] = {
+    # 每个键为用户输入的序号，值为 (描述, 处理函数) 元组。
+    "1": ("列出 Vultr 实例", handle_list_instances),
+    "2": ("选择当前实例并保存", handle_select_instance),
+    "3": ("查看当前实例详情", handle_show_instance_details),
+    "4": ("连接并测试 SSH", handle_test_ssh),
+    "5": ("一键环境部署/检查（远端）", handle_remote_bootstrap),
+    "6": ("部署/更新 ASR 仓库到远端", handle_deploy_repo),
+    "7": ("在 tmux 中后台运行 asr_quickstart.py", handle_run_asr_tmux),
+    "8": ("上传本地素材到远端输入目录", handle_upload_materials),
+    "9": ("实时查看远端日志", handle_tail_logs),
+    "10": ("回传 ASR 结果到本地", handle_fetch_results),
+    "11": ("停止/清理远端任务", handle_cleanup_remote),
+    "12": ("退出", lambda config: sys.exit(0)),  # 使用匿名函数统一出口逻辑。
+    "13": ("诊断远端 SSH 状态", handle_diagnose_ssh),
 }
 
-# 定义打印菜单的函数。
-def render_menu() -> None:
+# 定义构建菜单表格的函数，菜单内容固定，只在导入时构建一次。
+def _build_menu_table() -> Table:
     # 创建一个表格用于展示菜单项。
     table = Table(
         title="VULTRagent 主菜单",
@@ -1297,55 +1509,107 @@ def render_menu() -> None:
     # 添加操作描述列，启用自动换行避免影响边框。
     table.add_column("操作", style="magenta", overflow="fold")
     # 遍历 MENU_ACTIONS 并将每项加入表格。
-    for key, info in MENU_ACTIONS.items():
-        table.add_row(key, info["label"])
-    # 输出表格。
-    console.print(table)
+    for key, (label, _) in MENU_ACTIONS.items():
+        table.add_row(key, label)
+    return table
+
+
+# 预先构建的菜单表格，每次循环直接打印。
+_MENU_TABLE = _build_menu_table()
+# 非终端输出时使用的纯文本菜单，同样只构建一次。
+_MENU_PLAIN = "VULTRagent 主菜单\n" + "".join(f"{key}. {label}\n" for key, (label, _) in MENU_ACTIONS.items())
+
+
+# 定义打印菜单的函数。
+def render_menu() -> None:
+    # 输出被管道或重定向时无需表格排版，直接写出纯文本菜单。
+    if not console.is_terminal:
+        sys.stdout.write(_MENU_PLAIN)
+        return
+    # 输出预先构建的表格。
+    console.print(_MENU_TABLE)
+
+# 定义辅助函数，为菜单输入启用基于 readline 的序号补全。
+def _enable_menu_completion() -> None:
+    # Windows 自带的 Python 不提供 readline，此时保持普通输入即可。
+    try:
+        import readline
+    except ImportError:
+        return
+    keys = tuple(MENU_ACTIONS)
+
+    # 返回以当前输入为前缀的第 state 个菜单序号，超出范围时返回 None 结束补全。
+    def complete(text: str, state: int) -> Optional[str]:
+        matches = [key for key in keys if key.startswith(text)]
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer(complete)
+    readline.parse_and_bind("tab: complete")
 
 # 定义主循环函数，用于交互式处理用户输入。
-def interactive_menu() -> None:
-    # 读取配置数据。
-    config = load_configuration()
+def interactive_menu(config: Optional[Dict] = None) -> None:
+    # 读取配置数据，调用方已预先加载时直接复用。
+    if config is None:
+        config = load_configuration()
     # 获取 Vultr API Key。
     fetch_vultr_api_key()
+    # 在支持 readline 的平台上为菜单序号启用 Tab 补全。
+    _enable_menu_completion()
+    # 记录是否需要重新渲染菜单：输入无效时菜单仍在屏幕上，只需重新提示。
+    need_render = True
     # 进入无限循环直到用户选择退出。
     while True:
-        # 每次循环先渲染菜单。
-        render_menu()
-        # 提示用户输入操作序号。
-        choice = typer.prompt("请输入操作序号", default="12")
+        # 首次进入或执行过操作后才重新渲染菜单。
+        if need_render:
+            render_menu()
+        # 提示用户输入操作序号，直接使用 input() 读取，留空或输入结束时视为默认的退出选项。
+        try:
+            choice = input("请输入操作序号 [12]: ").strip() or "12"
+        except EOFError:
+            choice = "12"
         # 根据输入查找对应的菜单项。
-        action_info = MENU_ACTIONS.get(choice)
+        action = MENU_ACTIONS.get(choice)
         # 如果找到了有效的操作。
-        if action_info:
-            # 调用对应的处理函数。
-            action_info["handler"](config)
+        if action:
+            # 调用对应的处理函数，其输出会把菜单推出屏幕，下一轮需要重新渲染。
+            action[1](config)
+            need_render = True
         else:
-            # 如果输入无效则提示用户。
-            console.print(f"[red]无效的选项: {choice}，请重新输入。[/red]")
-
-# 定义独立命令以便直接在命令行触发 SSH 诊断。
-@app.command("check-ssh")
-def check_ssh_cli() -> None:
-    # Typer 命令函数，复用交互式菜单中的诊断逻辑。
-    config = load_configuration()
-    handle_diagnose_ssh(config)
-
-
-# 使用 Typer 的命令装饰器将 interactive_menu 暴露为 CLI 命令。
-@app.command()
-def menu() -> None:
-    # Typer 命令函数，仅调用 interactive_menu 启动菜单。
-    interactive_menu()
+            # 如果输入无效则提示用户，菜单保持不变，下一轮不再重复渲染；
+            # 以 style 指定颜色并关闭 markup 与高亮，跳过逐字符解析，输入中的方括号也不会被当作标签。
+            console.print(f"无效的选项: {choice}，请重新输入。", style="red", markup=False, highlight=False)
+            need_render = False
+
+# 定义构建 Typer 应用的函数，仅在带命令行参数启动时调用，无参数进入菜单时完全不导入 typer。
+def _build_app() -> "typer.Typer":
+    # 按需导入 typer 库以构建命令行应用。
+    import typer
+
+    # 创建 Typer 应用实例，关闭自动补全以保持菜单体验一致。
+    app = typer.Typer(add_completion=False)
+
+    # 定义 Typer 根回调，每次 CLI 调用只加载一次配置并通过上下文传给子命令。
+    @app.callback()
+    def _root(ctx: typer.Context) -> None:
+        ctx.obj = load_configuration()
+
+    # 定义独立命令以便直接在命令行触发 SSH 诊断。
+    @app.command("check-ssh")
+    def check_ssh_cli(ctx: typer.Context) -> None:
+        # Typer 命令函数，复用交互式菜单中的诊断逻辑与根回调加载的配置。
+        handle_diagnose_ssh(ctx.obj)
+
+    # 使用 Typer 的命令装饰器将 interactive_menu 暴露为 CLI 命令。
+    @app.command()
+    def menu(ctx: typer.Context) -> None:
+        # Typer 命令函数，将根回调加载的配置交给 interactive_menu 启动菜单。
+        interactive_menu(ctx.obj)
+
+    return app
 
 # 如果脚本作为主程序运行，则根据参数决定如何启动。
 if __name__ == "__main__":
-    # 在程序入口处提示用户进行环境检测。
-    print("\n=== 环境检测阶段 ===")
-    # 调用 ensure_local_rsync 检测本地 rsync 是否可用。
-    if not ensure_local_rsync(interactive=True):
-        # 当本地缺少 rsync 时给出警告提示。
-        print("[WARN] 本地 rsync 未就绪，请确认安装后重启程序。")
+    # 本地 rsync 检测推迟到首次上传、回传或镜像日志时进行，启动阶段不再执行。
     # 当没有额外命令行参数时直接进入交互式菜单，满足 "python main.py" 启动要求。
     if len(sys.argv) == 1:
         # 直接调用交互式菜单。
@@ -1358,4 +1622,4 @@ if __name__ == "__main__":
             handle_diagnose_ssh(config)
         else:
             # 其余情况交由 Typer 处理，包括 menu 与 check-ssh 子命令。
-            app()
+            _build_app()()
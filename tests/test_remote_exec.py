@@ -0,0 +1,67 @@
+"""core.remote_exec 终端输出行为的测试。"""
+
+import io
+import sys
+import unittest
+from unittest import mock
+
+from core import remote_exec
+
+
+class _CountingRaw(io.RawIOBase):
+    """记录底层写入次数的原始输出流，可模拟终端或重定向。"""
+
+    def __init__(self, tty: bool) -> None:
+        super().__init__()
+        self.tty = tty
+        self.writes = 0
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.tty
+
+    def write(self, data) -> int:
+        self.writes += 1
+        self.data += data
+        return len(data)
+
+
+def _make_stdout(tty: bool):
+    raw = _CountingRaw(tty)
+    stdout = io.TextIOWrapper(io.BufferedWriter(raw), encoding="utf-8")
+    return raw, stdout
+
+
+class WriteConsoleBytesTest(unittest.TestCase):
+    CHUNKS = 1000
+    CHUNK = b"line of output\n"
+
+    def _stream(self, tty: bool) -> _CountingRaw:
+        raw, stdout = _make_stdout(tty)
+        with mock.patch.object(sys, "stdout", stdout):
+            print("header")
+            remote_exec._begin_console_stream()
+            for _ in range(self.CHUNKS):
+                remote_exec._write_console_bytes(self.CHUNK)
+            remote_exec._flush_console()
+        return raw
+
+    def test_tty_flushes_every_chunk(self) -> None:
+        raw = self._stream(tty=True)
+        # 终端下每个块都应立即写出（另加流开始前的一次文本层冲刷）。
+        self.assertGreaterEqual(raw.writes, self.CHUNKS)
+        self.assertEqual(bytes(raw.data), b"header\n" + self.CHUNK * self.CHUNKS)
+
+    def test_non_tty_batches_writes(self) -> None:
+        raw = self._stream(tty=False)
+        # 非终端下由 BufferedWriter 攒批，底层写入次数远小于块数。
+        expected_bytes = len(self.CHUNK) * self.CHUNKS
+        self.assertLessEqual(raw.writes, expected_bytes // io.DEFAULT_BUFFER_SIZE + 3)
+        self.assertEqual(bytes(raw.data), b"header\n" + self.CHUNK * self.CHUNKS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+"""core.vultr_api 重试等待时长的测试。"""
+
+import unittest
+
+from core import vultr_api
+
+
+class _Response:
+    def __init__(self, retry_after, status_code: int = 429) -> None:
+        self.status_code = status_code
+        self.headers = {} if retry_after is None else {"Retry-After": retry_after}
+
+
+class RetryAfterSecondsTest(unittest.TestCase):
+    def test_numeric_value_is_used(self) -> None:
+        self.assertEqual(vultr_api._retry_after_seconds(_Response("2.5")), 2.5)
+
+    def test_large_value_is_capped(self) -> None:
+        self.assertEqual(vultr_api._retry_after_seconds(_Response("86400")), vultr_api.MAX_RETRY_AFTER_SEC)
+
+    def test_non_finite_or_invalid_values_are_ignored(self) -> None:
+        for value in ("nan", "inf", "-inf", "-5", "soon", None):
+            with self.subTest(value=value):
+                self.assertEqual(vultr_api._retry_after_seconds(_Response(value)), 0.0)
+
+    def test_only_applies_to_429(self) -> None:
+        self.assertEqual(vultr_api._retry_after_seconds(_Response("5", status_code=503)), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()